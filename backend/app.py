@@ -1,20 +1,32 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+import atexit
 import json
-import requests
+import time
+import uuid
 from models.forecasting_models import ARIMAModel, LSTMModel
+from models.forecast_engine import ForecastEngine, is_fallback
+from models.forecast_jobs import ForecastJobManager
+from models.forecast_tasks import build_forecast_tasks
 from utils.data_processor import DataProcessor
 from utils.external_apis import WeatherAPI, HolidayAPI
+from utils.forecast_store import ForecastStore, as_of_date
+from utils.job_store import JobStore
+from utils.metrics import metrics, RequestProfiler
+from utils.result_store import ResultStore
+from utils.inventory import ServiceLevelError
+from utils.simulation import ScenarioLimitError
+from utils.ttl_cache import TTLCache
+from utils.warmup import HotKeys, Warmup
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app, origins=['*'], methods=['GET', 'POST', 'PUT', 'DELETE'], allow_headers=['Content-Type'])
+CORS(app, origins=['*'], methods=['GET', 'POST', 'PUT', 'DELETE'],
+     allow_headers=['Content-Type', 'X-Profile'], expose_headers=['X-Profile-Id'])
 
 # Initialize models and APIs
 data_processor = DataProcessor()
@@ -23,7 +35,62 @@ holiday_api = HolidayAPI()
 
 # Global model instances
 arima_model = ARIMAModel()
-lstm_model = LSTMModel()
+# The global LSTM is trained on the catalog, not on whichever series are requested first
+lstm_model = LSTMModel(
+    training_series=lambda: data_processor.get_catalog_series(int(os.environ.get('LSTM_TRAIN_SERIES', 1000)))
+)
+
+# Fans per-series fitting out across worker processes for large requests
+forecast_engine = ForecastEngine(models={'arima': arima_model, 'lstm': lstm_model})
+
+# Precomputed forecasts served before falling back to live computation;
+# an empty FORECAST_STORE_PATH disables it
+forecast_store = ForecastStore() if os.environ.get('FORECAST_STORE_PATH') != '' else None
+
+# Recent forecast results, referenced by forecast_id from the simulation and
+# inventory endpoints so clients don't post whole forecasts back; shared between
+# worker processes unless FORECAST_RESULT_STORE_PATH is empty
+if os.environ.get('FORECAST_RESULT_STORE_PATH') != '':
+    forecast_results = ResultStore()
+else:
+    forecast_results = TTLCache(
+        max_entries=int(os.environ.get('FORECAST_RESULT_CACHE_SIZE', 200)),
+        ttl=float(os.environ.get('FORECAST_RESULT_TTL_SECONDS', 3600)),
+        stale_ttl=0,
+        name='forecast-results'
+    )
+
+# Background queue for forecast runs too large for a single request; job state
+# is shared between worker processes unless FORECAST_JOB_STORE_PATH is empty
+forecast_jobs = ForecastJobManager(
+    forecast_engine,
+    store=JobStore() if os.environ.get('FORECAST_JOB_STORE_PATH') != '' else None
+)
+
+# cProfile for requests sent with an X-Profile header
+request_profiler = RequestProfiler()
+
+# Most requested series, pre-fitted in the background after startup (WARMUP_KEYS)
+hot_keys = HotKeys()
+atexit.register(hot_keys.save)
+warmup = Warmup(hot_keys, lambda *args: _build_forecast_tasks(*args), arima_model, data_processor.get_all_keys)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = request_profiler.start(request.headers.get('X-Profile'))
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.observe('http_request_duration_seconds', time.perf_counter() - g.request_start,
+                    endpoint=endpoint, method=request.method, status=response.status_code)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profile_id = uuid.uuid4().hex
+        request_profiler.finish(profiler, profile_id, f"{request.method} {request.path} -> {response.status_code}")
+        response.headers['X-Profile-Id'] = profile_id
+    return response
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -58,7 +125,12 @@ def debug_info():
             'holiday_api': 'working',
             'test_data_keys': list(test_data.keys()),
             'test_weather_keys': list(test_weather.keys()),
-            'test_holidays_count': len(test_holidays)
+            'test_holidays_count': len(test_holidays),
+            'arima_fit_stats': arima_model.order_selector.stats(),
+            'arima_cache_stats': arima_model.models.stats(),
+            'weather_cache_stats': weather_api.cache.stats(),
+            'forecast_store_stats': forecast_store.stats() if forecast_store is not None else None,
+            'warmup': warmup.stats()
         })
     except Exception as e:
         return jsonify({
@@ -67,6 +139,21 @@ def debug_info():
             'traceback': str(e.__class__.__name__)
         }), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Counters and latency histograms in the Prometheus text format"""
+    metrics.set_gauge('forecast_result_cache_entries', len(forecast_results))
+    metrics.set_gauge('arima_model_cache_entries', arima_model.models.stats()['entries'])
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """cProfile report of a request sent with an X-Profile header"""
+    report = request_profiler.report(profile_id)
+    if report is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return Response(report, mimetype='text/plain')
+
 @app.route('/api/forecast', methods=['POST'])
 def generate_forecast():
     """Generate demand forecast for given SKUs and stores"""
@@ -79,105 +166,222 @@ def generate_forecast():
         store_ids = data.get('store_ids', [])
         forecast_days = data.get('forecast_days', 30)
         model_type = data.get('model_type', 'arima')  # Changed default to arima
+        stream = data.get('stream', False) or request.accept_mimetypes.best == 'application/x-ndjson'
         
         if not sku_ids or not store_ids:
             return jsonify({'success': False, 'error': 'SKU IDs and Store IDs are required'}), 400
         
-        print(f"Generating forecast for SKUs: {sku_ids}, Stores: {store_ids}, Days: {forecast_days}, Model: {model_type}")
+        print(f"Generating forecast for {len(sku_ids)} SKUs x {len(store_ids)} stores, Days: {forecast_days}, Model: {model_type}")
         
-        # Get historical data
-        historical_data = data_processor.get_historical_data(sku_ids, store_ids)
-        print(f"Historical data keys: {list(historical_data.keys())}")
+        tasks = _build_forecast_tasks(sku_ids, store_ids, forecast_days)
+        hot_keys.record((task['sku_id'], task['store_id']) for task in tasks)
         
-        # Get external factors
-        weather_data = weather_api.get_weather_forecast(store_ids, forecast_days)
-        holiday_data = holiday_api.get_holidays(forecast_days)
+        if stream:
+            return Response(
+                stream_with_context(_stream_forecasts(tasks, model_type, forecast_days)),
+                mimetype='application/x-ndjson'
+            )
         
-        # Generate forecasts
-        forecasts = {}
-        for sku_id in sku_ids:
-            for store_id in store_ids:
-                key = f"{sku_id}_{store_id}"
-                print(f"Processing forecast for key: {key}")
-                
-                if key not in historical_data:
-                    print(f"Warning: No historical data for key {key}")
-                    continue
-                
-                try:
-                    if model_type == 'lstm':
-                        forecast = lstm_model.predict(
-                            historical_data[key], 
-                            weather_data.get(store_id, []), 
-                            holiday_data, 
-                            forecast_days
-                        )
-                    else:
-                        forecast = arima_model.predict(
-                            historical_data[key], 
-                            weather_data.get(store_id, []), 
-                            holiday_data, 
-                            forecast_days
-                        )
-                    
-                    forecasts[key] = {
-                        'sku_id': sku_id,
-                        'store_id': store_id,
-                        'forecast': forecast['forecast'],
-                        'confidence_interval': forecast.get('confidence_interval', {}),
-                        'feature_importance': forecast.get('feature_importance', {})
-                    }
-                    print(f"Successfully generated forecast for {key}")
-                    
-                except Exception as model_error:
-                    print(f"Error generating forecast for {key}: {str(model_error)}")
-                    # Use simple fallback forecast
-                    forecasts[key] = {
-                        'sku_id': sku_id,
-                        'store_id': store_id,
-                        'forecast': [50] * forecast_days,  # Simple fallback
-                        'confidence_interval': {
-                            'lower': [40] * forecast_days,
-                            'upper': [60] * forecast_days
-                        },
-                        'feature_importance': {
-                            'model_type': 'Fallback',
-                            'error': str(model_error)
-                        }
-                    }
+        # Serve precomputed forecasts and compute the rest (results come back in task order)
+        with metrics.timer('forecast_stage_seconds', stage='forecast'):
+            results = _read_through_forecasts(tasks, model_type, forecast_days)
+        forecasts = {task['key']: result for task, result in zip(tasks, results)}
         
         if not forecasts:
             return jsonify({'success': False, 'error': 'No forecasts generated'}), 500
         
-        return jsonify({
-            'success': True,
+        result = {
             'forecasts': forecasts,
             'model_used': model_type,
             'forecast_days': forecast_days
-        })
+        }
+        with metrics.timer('forecast_stage_seconds', stage='encode'):
+            return jsonify({'success': True, 'forecast_id': _remember_forecast(result), **result})
         
     except Exception as e:
         print(f"Forecast generation error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _build_forecast_tasks(sku_ids, store_ids, forecast_days):
+    """Load history and external factors and build one task per SKU/store series"""
+    keys = [(sku_id, store_id) for sku_id in sku_ids for store_id in store_ids]
+    return build_forecast_tasks(data_processor, weather_api, holiday_api, keys, forecast_days)
+
+def _read_through_forecasts(tasks, model_type, forecast_days):
+    """Forecasts from the precomputed store, computing and storing any misses"""
+    results = [None] * len(tasks)
+    for index, entry in _iter_read_through(tasks, model_type, forecast_days):
+        results[index] = entry
+    return results
+
+def _iter_read_through(tasks, model_type, forecast_days):
+    """(task index, entry) pairs: stored forecasts first, then the misses as they are computed"""
+    if forecast_store is None:
+        yield from forecast_engine.iter_run(tasks, model_type, forecast_days)
+        return
+    
+    keys = [(task['sku_id'], task['store_id'], as_of_date(task['data'])) for task in tasks]
+    with metrics.timer('forecast_stage_seconds', stage='store_lookup'):
+        stored = forecast_store.get_many(keys, model_type, forecast_days)
+    missing = [index for index, key in enumerate(keys) if key[:2] not in stored]
+    metrics.inc('forecast_store_lookups_total', len(tasks) - len(missing), result='hit')
+    metrics.inc('forecast_store_lookups_total', len(missing), result='miss')
+    for index, key in enumerate(keys):
+        if key[:2] in stored:
+            yield index, stored[key[:2]]
+    if not missing:
+        return
+    
+    rows = []
+    iterator = forecast_engine.iter_run([tasks[index] for index in missing], model_type, forecast_days)
+    try:
+        for position, entry in iterator:
+            index = missing[position]
+            # Fallbacks from errors, timeouts and failed fits are retried next time
+            if not is_fallback(entry):
+                rows.append(keys[index] + (entry,))
+            yield index, entry
+    finally:
+        # Also keeps what was computed before a streaming client went away
+        iterator.close()
+        if rows:
+            forecast_store.put_many(rows, model_type, forecast_days)
+
+def _remember_forecast(result):
+    """Keep a forecast result server-side and return its forecast_id"""
+    forecast_id = uuid.uuid4().hex
+    forecast_results.put(forecast_id, result)
+    return forecast_id
+
+def _lookup_forecast(data, field):
+    """(forecast, error response) from the request's forecast_id, or the posted payload"""
+    forecast_id = data.get('forecast_id')
+    if not forecast_id:
+        return data.get(field, {}), None
+    forecast, _ = forecast_results.get(forecast_id)
+    if forecast is None:
+        return None, (jsonify({'success': False, 'error': f'Unknown or expired forecast_id {forecast_id}'}), 404)
+    return forecast, None
+
+def _stream_forecasts(tasks, model_type, forecast_days):
+    """Yield one NDJSON line per finished series, then a summary line"""
+    completed = 0
+    forecasts = {}
+    try:
+        for index, entry in _iter_read_through(tasks, model_type, forecast_days):
+            completed += 1
+            forecasts[tasks[index]['key']] = entry
+            yield json.dumps({'type': 'forecast', 'key': tasks[index]['key'], **entry}) + '\n'
+        result = {'forecasts': forecasts, 'model_used': model_type, 'forecast_days': forecast_days}
+        yield json.dumps({
+            'type': 'summary',
+            'success': completed > 0,
+            'forecast_count': completed,
+            'forecast_id': _remember_forecast(result) if forecasts else None,
+            'model_used': model_type,
+            'forecast_days': forecast_days
+        }) + '\n'
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        print(f"Forecast streaming error: {str(e)}")
+        yield json.dumps({'type': 'summary', 'success': False, 'forecast_count': completed, 'error': str(e)}) + '\n'
+
+@app.route('/api/forecast/jobs', methods=['POST'])
+def submit_forecast_job():
+    """Queue a forecast run and return its job ID for polling"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
+        
+        sku_ids = data.get('sku_ids', [])
+        store_ids = data.get('store_ids', [])
+        forecast_days = data.get('forecast_days', 30)
+        model_type = data.get('model_type', 'arima')
+        
+        if not sku_ids or not store_ids:
+            return jsonify({'success': False, 'error': 'SKU IDs and Store IDs are required'}), 400
+        
+        job = forecast_jobs.submit(
+            lambda: _build_forecast_tasks(sku_ids, store_ids, forecast_days),
+            model_type,
+            forecast_days,
+            params={'sku_count': len(sku_ids), 'store_count': len(store_ids),
+                    'forecast_days': forecast_days, 'model_type': model_type}
+        )
+        
+        return jsonify({'success': True, 'job': job.to_dict()}), 202
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/forecast/jobs/<job_id>', methods=['GET'])
+def get_forecast_job(job_id):
+    """Get status and progress of a forecast job"""
+    job = forecast_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/api/forecast/jobs/<job_id>', methods=['DELETE'])
+def cancel_forecast_job(job_id):
+    """Cancel a queued or running forecast job"""
+    job = forecast_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/api/forecast/jobs/<job_id>/result', methods=['GET'])
+def get_forecast_job_result(job_id):
+    """Get the forecasts of a completed job"""
+    job = forecast_jobs.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job.status != 'completed':
+        return jsonify({'success': False, 'error': f"Job is {job.status}", 'job': job.to_dict()}), 409
+    return jsonify({'success': True, **job.result})
+
 @app.route('/api/simulation', methods=['POST'])
 def run_simulation():
     """Run what-if simulations"""
     try:
         data = request.get_json()
-        base_forecast = data.get('base_forecast', {})
+        base_forecast, error = _lookup_forecast(data, 'base_forecast')
+        if error:
+            return error
         scenario = data.get('scenario', {})
         
+        # Sweep many scenarios at once: an explicit list and/or every combination of a grid
+        if data.get('scenarios') or data.get('scenario_grid'):
+            engine = data_processor.scenario_engine
+            scenarios = list(data.get('scenarios') or []) + engine.expand_grid(data.get('scenario_grid') or {})
+            results = engine.run(base_forecast, scenarios, data.get('include_forecasts', False))
+            return jsonify({
+                'success': True,
+                'scenario_count': len(scenarios),
+                'results': results
+            })
+        
         # Apply scenario changes
         modified_forecast = data_processor.apply_scenario(base_forecast, scenario)
         
-        return jsonify({
+        response = {
             'success': True,
-            'original_forecast': base_forecast,
             'modified_forecast': modified_forecast,
             'scenario_applied': scenario
-        })
+        }
+        # Clients posting full payloads keep the result themselves unless they ask for a handle
+        if data.get('forecast_id') or data.get('return_forecast_id'):
+            response['modified_forecast_id'] = _remember_forecast(modified_forecast)
+        if data.get('forecast_id'):
+            # The client already holds the original, so only its reference goes back
+            response['forecast_id'] = data['forecast_id']
+        else:
+            response['original_forecast'] = base_forecast
+        return jsonify(response)
         
+    except ScenarioLimitError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -186,11 +390,13 @@ def get_inventory_suggestions():
     """Generate inventory suggestions based on forecasts"""
     try:
         data = request.get_json()
-        forecasts = data.get('forecasts', {})
+        forecasts, error = _lookup_forecast(data, 'forecasts')
+        if error:
+            return error
         current_inventory = data.get('current_inventory', {})
         
         suggestions = data_processor.generate_inventory_suggestions(
-            forecasts, current_inventory
+            forecasts, current_inventory, data.get('service_level')
         )
         
         return jsonify({
@@ -198,6 +404,8 @@ def get_inventory_suggestions():
             'suggestions': suggestions
         })
         
+    except ServiceLevelError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -253,4 +461,5 @@ def get_weather_data():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
+    warmup.start()
     app.run(debug=False, host='0.0.0.0', port=port) 
\ No newline at end of file
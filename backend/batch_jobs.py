@@ -0,0 +1,127 @@
+import argparse
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.data_processor import DataProcessor
+from utils.external_apis import WeatherAPI, HolidayAPI
+from utils.forecast_store import ForecastStore, as_of_date
+from models.forecasting_models import ARIMAModel, LSTMModel
+from models.forecast_engine import ForecastEngine, is_fallback
+from models.forecast_tasks import build_forecast_tasks
+from models.features import attach_features
+
+# Per-process state for update workers; the ARIMA models share the disk cache
+_worker_state = {}
+
+
+def _update_chunk(keys):
+    """Bring the cached ARIMA models for a chunk of series up to date"""
+    if not _worker_state:
+        _worker_state['processor'] = DataProcessor()
+        _worker_state['weather_api'] = WeatherAPI()
+        _worker_state['holidays'] = HolidayAPI().holidays
+        _worker_state['model'] = ARIMAModel()
+    processor = _worker_state['processor']
+    model = _worker_state['model']
+
+    statuses = Counter()
+    for sku_id, store_id in keys:
+        historical_data = processor.get_historical_data([sku_id], [store_id])
+        data = historical_data.get(f"{sku_id}_{store_id}")
+        if data is None:
+            statuses['missing'] += 1
+            continue
+        # The history regressors match the ones requests fit on; the horizon only affects future rows
+        attach_features(historical_data, _worker_state['weather_api'], _worker_state['holidays'], 1)
+        _, status = model.update(data, f"{sku_id}_{store_id}")
+        statuses[status] += 1
+    return statuses
+
+
+def update_models(workers=None, chunk_size=50):
+    """Nightly run: append the newest days to every cached model, refitting on drift"""
+    keys = DataProcessor().get_all_keys()
+    chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+
+    started = time.perf_counter()
+    statuses = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_statuses in executor.map(_update_chunk, chunks):
+            statuses.update(chunk_statuses)
+    return {
+        'series': len(keys),
+        'statuses': dict(statuses),
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+def precompute(model_types, horizons, workers=None, batch_size=1000, store_path=None):
+    """Nightly run: forecast every series into the forecast store for the API to serve"""
+    processor = DataProcessor()
+    weather_api = WeatherAPI()
+    holiday_api = HolidayAPI()
+    store = ForecastStore(store_path)
+    engine = ForecastEngine(models={'arima': ARIMAModel(), 'lstm': LSTMModel()}, max_workers=workers)
+    keys = processor.get_all_keys()
+
+    started = time.perf_counter()
+    written = Counter()
+    fallbacks = 0
+    oldest_as_of = None
+    try:
+        # Batches bound how much history and how many results are held at once
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            for forecast_days in horizons:
+                tasks = build_forecast_tasks(processor, weather_api, holiday_api, batch, forecast_days)
+                for model_type in model_types:
+                    rows = []
+                    for task, entry in zip(tasks, engine.run(tasks, model_type, forecast_days)):
+                        if is_fallback(entry):
+                            fallbacks += 1
+                            continue
+                        as_of = as_of_date(task['data'])
+                        oldest_as_of = min(oldest_as_of or as_of, as_of)
+                        rows.append((task['sku_id'], task['store_id'], as_of, entry))
+                    store.put_many(rows, model_type, forecast_days)
+                    written[f"{model_type}_{forecast_days}"] += len(rows)
+    finally:
+        engine.shutdown()
+
+    # Forecasts from superseded history will never be served again
+    pruned = store.prune(oldest_as_of) if oldest_as_of else 0
+    return {
+        'series': len(keys),
+        'written': dict(written),
+        'fallbacks': fallbacks,
+        'pruned': pruned,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline forecasting jobs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    update = subparsers.add_parser('update-models', help='Incrementally update cached ARIMA models')
+    update.add_argument('--workers', type=int, default=None)
+    update.add_argument('--chunk-size', type=int, default=50)
+
+    forecasts = subparsers.add_parser('precompute', help='Precompute forecasts for every series into the forecast store')
+    forecasts.add_argument('--models', nargs='+', default=['arima'], choices=['arima', 'lstm', 'batch'])
+    forecasts.add_argument('--days', nargs='+', type=int, default=[7, 14, 30], help='Forecast horizons to store')
+    forecasts.add_argument('--workers', type=int, default=None)
+    forecasts.add_argument('--batch-size', type=int, default=1000)
+    forecasts.add_argument('--store', default=None, help='SQLite path (default: FORECAST_STORE_PATH)')
+
+    args = parser.parse_args()
+    if args.command == 'update-models':
+        print(json.dumps(update_models(args.workers, args.chunk_size)))
+    elif args.command == 'precompute':
+        print(json.dumps(precompute(args.models, args.days, args.workers, args.batch_size, args.store)))
+
+
+if __name__ == '__main__':
+    main()
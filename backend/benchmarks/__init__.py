@@ -0,0 +1 @@
+# Benchmark suite: python -m benchmarks.run
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""Closed-loop load test against a running backend
+
+Each virtual planner repeats the frontend's flow: generate a forecast for a
+random selection of SKUs and stores, then (with --simulation-ratio
+probability) run a what-if scenario and look at store performance, then
+fetch inventory suggestions. Follow-up calls reference the forecast by
+forecast_id. A planner only sends its next request once the previous one has
+answered, so throughput is what the server sustains at that concurrency.
+
+A planner keeps one keep-alive connection by default, which gunicorn pins to
+one worker; ``--connections session`` or ``request`` opens new connections
+so follow-up calls can land on another worker, as behind a load balancer.
+
+    cd backend
+    python app.py &
+    python -m benchmarks.loadtest --url http://localhost:5000 --concurrency 10 50 200 --duration 60
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+SKUS = ['SKU001', 'SKU002', 'SKU003', 'SKU004', 'SKU005']
+STORES = ['STORE001', 'STORE002', 'STORE003']
+FORECAST_DAYS = [7, 14, 30]
+COMPETITOR_ACTIONS = ['none', 'price_cut', 'promotion', 'new_product', 'aggressive']
+PERCENTILES = (50, 90, 99)
+
+
+class Recorder:
+    """Thread-safe latency samples per step, skipping those started during warm-up"""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.samples = defaultdict(list)  # step -> [(latency seconds, ok)]
+        self.errors = defaultdict(Counter)  # step -> {error kind: count}
+        self._lock = threading.Lock()
+
+    def record(self, step, started, latency, error=None):
+        if started < self.measure_from:
+            return
+        with self._lock:
+            self.samples[step].append((latency, error is None))
+            if error is not None:
+                self.errors[step][error] += 1
+
+
+class Planner:
+    """One virtual user with its own connection, reopened per --connections"""
+
+    def __init__(self, base_url, recorder, args, seed):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(seed)
+        self.session = self._new_session()
+
+    def _new_session(self):
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        if self.args.connections == 'request':
+            # The server closes the connection after answering, so every call reconnects
+            session.headers['Connection'] = 'close'
+        return session
+
+    def _call(self, step, method, path, **kwargs):
+        """Response JSON, or None when the call failed (the failure is recorded)"""
+        started = time.time()
+        timer = time.perf_counter()
+        error = None
+        payload = None
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}"
+            else:
+                payload = response.json()
+                if payload.get('success') is False:
+                    error = 'success=false'
+        except (requests.RequestException, ValueError) as e:
+            error = type(e).__name__
+        self.recorder.record(step, started, time.perf_counter() - timer, error)
+        return payload if error is None else None
+
+    def session_once(self):
+        """One pass through the planner flow"""
+        if self.args.connections == 'session':
+            self.session.close()
+            self.session = self._new_session()
+        started = time.time()
+        timer = time.perf_counter()
+        sku_ids = self.rng.sample(SKUS, self.rng.randint(1, self.args.max_skus))
+        store_ids = self.rng.sample(STORES, self.rng.randint(1, self.args.max_stores))
+        forecast = self._call('forecast', 'POST', '/api/forecast', json={
+            'sku_ids': sku_ids,
+            'store_ids': store_ids,
+            'forecast_days': self.rng.choice(FORECAST_DAYS),
+            'model_type': self.rng.choice(self.args.models)
+        })
+        ok = forecast is not None
+        if ok:
+            forecast_id = forecast['forecast_id']
+            if self.rng.random() < self.args.simulation_ratio:
+                ok = self._call('simulation', 'POST', '/api/simulation', json={
+                    'forecast_id': forecast_id,
+                    'scenario': {
+                        'weather_impact': round(self.rng.uniform(0.8, 1.3), 2),
+                        'promotion_impact': round(self.rng.uniform(1.0, 1.5), 2),
+                        'holiday_impact': 1.0,
+                        'price_change': self.rng.choice([-20, -10, 0, 5, 10, 20]),
+                        'competitor_action': self.rng.choice(COMPETITOR_ACTIONS)
+                    }
+                }) is not None and ok
+                ok = self._call('store_performance', 'GET', '/api/store-performance',
+                                params={'store_ids': ','.join(store_ids), 'days': 30}) is not None and ok
+            inventory = {key: self.rng.randint(0, 3000) for key in forecast['forecasts']}
+            ok = self._call('inventory', 'POST', '/api/inventory-suggestions', json={
+                'forecast_id': forecast_id,
+                'current_inventory': inventory
+            }) is not None and ok
+        self.recorder.record('session', started, time.perf_counter() - timer, None if ok else 'failed step')
+
+    def run(self, deadline):
+        while time.time() < deadline:
+            self.session_once()
+            if self.args.think_time > 0:
+                time.sleep(min(self.rng.expovariate(1 / self.args.think_time), max(0, deadline - time.time())))
+
+
+def run_level(base_url, concurrency, args):
+    """Drive the backend with a fixed number of planners and summarise the samples"""
+    start = time.time()
+    recorder = Recorder(measure_from=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+    planners = [Planner(base_url, recorder, args, seed=args.seed * 100003 + index) for index in range(concurrency)]
+    threads = [threading.Thread(target=planner.run, args=(deadline,), daemon=True) for planner in planners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Planners finish their in-flight session after the deadline, so measure the real window
+    elapsed = max(time.time() - recorder.measure_from, 1e-9)
+    return summarise(recorder, elapsed)
+
+
+def summarise(recorder, elapsed):
+    steps = {}
+    for step, samples in recorder.samples.items():
+        latencies = np.array([latency for latency, _ in samples])
+        errors = sum(1 for _, ok in samples if not ok)
+        summary = {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': errors / len(samples),
+            'throughput_rps': len(samples) / elapsed,
+            'max_ms': float(latencies.max() * 1000),
+            'error_kinds': dict(recorder.errors[step])
+        }
+        for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+            summary[f"p{p}_ms"] = float(value * 1000)
+        steps[step] = summary
+    return {'elapsed_seconds': elapsed, 'steps': steps}
+
+
+def print_report(concurrency, result):
+    print(f"\nconcurrency {concurrency}  ({result['elapsed_seconds']:.1f}s measured)")
+    print(f"{'step':18s} {'requests':>9s} {'req/s':>8s} {'errors':>7s} "
+          + ' '.join(f"{f'p{p} ms':>9s}" for p in PERCENTILES) + f" {'max ms':>9s}")
+    order = ['forecast', 'simulation', 'store_performance', 'inventory', 'session']
+    for step in sorted(result['steps'], key=lambda s: order.index(s) if s in order else len(order)):
+        s = result['steps'][step]
+        print(f"{step:18s} {s['requests']:9d} {s['throughput_rps']:8.2f} {s['error_rate']:7.1%} "
+              + ' '.join(f"{s[f'p{p}_ms']:9.1f}" for p in PERCENTILES) + f" {s['max_ms']:9.1f}")
+        if s['error_kinds']:
+            print(f"{'':18s} errors: " + ', '.join(f"{kind} x{count}" for kind, count in s['error_kinds'].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000', help='backend base URL')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[10], help='planner counts, run in turn')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before each level')
+    parser.add_argument('--think-time', type=float, default=0, help='mean pause between sessions in seconds')
+    parser.add_argument('--models', nargs='+', default=['arima', 'batch'], help='model_type values picked at random')
+    parser.add_argument('--max-skus', type=int, default=len(SKUS), help='most SKUs per forecast')
+    parser.add_argument('--max-stores', type=int, default=len(STORES), help='most stores per forecast')
+    parser.add_argument('--simulation-ratio', type=float, default=0.5,
+                        help='share of sessions that also run a simulation and store performance')
+    parser.add_argument('--connections', choices=['keep-alive', 'session', 'request'], default='keep-alive',
+                        help='reuse one connection per planner, or open a new one per session or per request')
+    parser.add_argument('--timeout', type=float, default=120, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        requests.get(args.url.rstrip('/') + '/api/health', timeout=10).raise_for_status()
+    except requests.RequestException as e:
+        print(f"Backend at {args.url} is not healthy: {e}")
+        return 2
+
+    results = {
+        'url': args.url,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'think_time': args.think_time,
+        'models': args.models,
+        'connections': args.connections,
+        'levels': {}
+    }
+    for concurrency in args.concurrency:
+        result = run_level(args.url, concurrency, args)
+        results['levels'][str(concurrency)] = result
+        print_report(concurrency, result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
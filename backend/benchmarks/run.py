@@ -0,0 +1,411 @@
+"""Benchmark suite for the forecasting backend
+
+Micro-benchmarks time the hot functions at 1, 100 and 10k series on seeded
+synthetic data; endpoint benchmarks drive the Flask app through its test
+client. Results are written as JSON, and ``--compare`` flags benchmarks whose
+median got slower than a saved baseline by more than ``--threshold``.
+
+    cd backend
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Benchmarks must not read or write the on-disk caches or stores
+os.environ['MODEL_CACHE_DIR'] = ''
+os.environ['FORECAST_STORE_PATH'] = ''
+os.environ['FORECAST_JOB_STORE_PATH'] = ''
+os.environ['FORECAST_RESULT_STORE_PATH'] = ''
+os.environ['HOT_KEYS_PATH'] = ''
+os.environ.pop('SALES_HISTORY_PATH', None)
+os.environ.pop('OPENWEATHER_API_KEY', None)
+
+import numpy as np
+
+SEED = 42
+HISTORY_DAYS = 91
+FORECAST_DAYS = 30
+DEFAULT_SIZES = (1, 100, 10000)
+
+BENCHMARKS = {}
+
+
+def benchmark(name, max_size=None, repeat=None):
+    """Register setup(size) -> callable as a benchmark"""
+    def register(setup):
+        BENCHMARKS[name] = {'setup': setup, 'max_size': max_size, 'repeat': repeat}
+        return setup
+    return register
+
+
+def _keys(size):
+    return [(f"SKU{i % 1000:04d}", f"STORE{i // 1000:03d}") for i in range(size)]
+
+
+def _series(size, days=HISTORY_DAYS):
+    """Seeded synthetic series shaped like DataProcessor.get_historical_data output"""
+    from utils.data_generator import SyntheticSalesGenerator
+    from utils.sales_store import SalesStore
+
+    generator = SyntheticSalesGenerator(seed=SEED)
+    keys = _keys(size)
+    end = np.datetime64('2025-01-01')
+    dates = np.arange(end - days + 1, end + 1)
+    store = SalesStore(dates, sales=generator.generate(keys, dates, generator.base_demands(keys)), keys=keys)
+    return {f"{sku_id}_{store_id}": store.series(sku_id, store_id) for sku_id, store_id in keys}
+
+
+def _forecast_response(size, days=FORECAST_DAYS):
+    """Seeded forecast response in the /api/forecast shape"""
+    rng = np.random.default_rng(SEED)
+    point = rng.uniform(10, 200, (size, days))
+    spread = point * rng.uniform(0.1, 0.4, (size, 1))
+    forecasts = {}
+    for row, (sku_id, store_id) in enumerate(_keys(size)):
+        forecasts[f"{sku_id}_{store_id}"] = {
+            'sku_id': sku_id,
+            'store_id': store_id,
+            'forecast': point[row].tolist(),
+            'confidence_interval': {
+                'lower': (point[row] - spread[row]).tolist(),
+                'upper': (point[row] + spread[row]).tolist()
+            }
+        }
+    return {'forecasts': forecasts, 'model_used': 'arima', 'forecast_days': days}
+
+
+# --- Micro-benchmarks -------------------------------------------------------
+
+@benchmark('arima_fit', max_size=100, repeat=1)
+def _arima_fit(size):
+    from models.forecasting_models import ARIMAModel
+    series = _series(size)
+    # Untimed fit on a throwaway model so the lazily imported libraries are loaded
+    ARIMAModel().fit(next(iter(series.values())), 'warmup')
+
+    def run():
+        model = ARIMAModel()
+        for key, data in series.items():
+            model.fit(data, key)
+    return run
+
+
+@benchmark('arima_predict_cached', max_size=100)
+def _arima_predict_cached(size):
+    from models.forecasting_models import ARIMAModel
+    series = _series(size)
+    model = ARIMAModel()
+    for key, data in series.items():
+        model.fit(data, key)
+
+    def run():
+        for data in series.values():
+            model.predict(data, forecast_days=FORECAST_DAYS)
+    return run
+
+
+@benchmark('lstm_prepare_data')
+def _lstm_prepare_data(size):
+    from models.forecasting_models import LSTMModel
+    series = list(_series(size).values())
+    model = LSTMModel()
+
+    def run():
+        for data in series:
+            model.prepare_data(data)
+    return run
+
+
+@benchmark('lstm_fit_many', max_size=100, repeat=1)
+def _lstm_fit_many(size):
+    from models.forecasting_models import LSTMModel
+    series = list(_series(size).values())
+
+    def run():
+        LSTMModel(epochs=2, seed=SEED).fit_many(series)
+    return run
+
+
+@benchmark('lstm_predict_many')
+def _lstm_predict_many(size):
+    from models.forecasting_models import LSTMModel
+    series = list(_series(size).values())
+    model = LSTMModel(epochs=1, seed=SEED)
+    model.fit_many(series[:100])
+
+    def run():
+        model.predict_many(series, FORECAST_DAYS)
+    return run
+
+
+@benchmark('batch_forecast')
+def _batch_forecast(size):
+    from models.batch_models import BatchForecaster, stack_series
+    series = _series(size)
+    sales = stack_series(series, list(series))
+    forecaster = BatchForecaster()
+
+    def run():
+        forecaster.predict(sales, FORECAST_DAYS)
+    return run
+
+
+@benchmark('data_generation')
+def _data_generation(size):
+    from utils.data_generator import SyntheticSalesGenerator
+    generator = SyntheticSalesGenerator(seed=SEED)
+    keys = _keys(size)
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + 365)
+    base_demands = generator.base_demands(keys)
+
+    def run():
+        generator.generate(keys, dates, base_demands)
+    return run
+
+
+@benchmark('feature_build')
+def _feature_build(size):
+    from models.features import attach_features
+    from utils.external_apis import WeatherAPI, HolidayAPI
+    series = _series(size)
+    weather_api = WeatherAPI()
+    holidays = HolidayAPI().holidays
+
+    def run():
+        attach_features(series, weather_api, holidays, FORECAST_DAYS)
+    return run
+
+
+@benchmark('apply_scenario')
+def _apply_scenario(size):
+    from utils.data_processor import DataProcessor
+    processor = DataProcessor()
+    response = _forecast_response(size)
+    scenario = {'weather_impact': 1.1, 'promotion_impact': 1.2, 'price_change': 5, 'competitor_action': 'promotion'}
+
+    def run():
+        processor.apply_scenario(response, scenario)
+    return run
+
+
+@benchmark('scenario_grid_100')
+def _scenario_grid(size):
+    from utils.simulation import ScenarioEngine
+    engine = ScenarioEngine()
+    response = _forecast_response(size)
+    scenarios = engine.expand_grid({
+        'price_change': [-20, -10, -5, 0, 5, 10, 15, 20, 25, 30],
+        'promotion_impact': [1.0, 1.1, 1.2, 1.3, 1.5],
+        'competitor_action': ['none', 'aggressive']
+    })
+
+    def run():
+        engine.run(response, scenarios)
+    return run
+
+
+@benchmark('inventory_suggestions')
+def _inventory_suggestions(size):
+    from utils.data_processor import DataProcessor
+    processor = DataProcessor()
+    response = _forecast_response(size)
+    rng = np.random.default_rng(SEED)
+    inventory = {key: int(stock) for key, stock in zip(response['forecasts'], rng.integers(0, 3000, size))}
+
+    def run():
+        processor.generate_inventory_suggestions(response, inventory)
+    return run
+
+
+# --- Endpoint benchmarks ----------------------------------------------------
+
+ALL_SKUS = ['SKU001', 'SKU002', 'SKU003', 'SKU004', 'SKU005']
+ALL_STORES = ['STORE001', 'STORE002', 'STORE003']
+_client = None
+
+
+def _app_client():
+    global _client
+    if _client is None:
+        from app import app
+        _client = app.test_client()
+    return _client
+
+
+def _post(path, body):
+    response = _client.post(path, json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response.get_json()
+
+
+def _endpoint_forecast(model_type):
+    body = {'sku_ids': ALL_SKUS, 'store_ids': ALL_STORES, 'forecast_days': FORECAST_DAYS, 'model_type': model_type}
+
+    def setup(size):
+        _app_client()
+        return lambda: _post('/api/forecast', body)
+    return setup
+
+
+benchmark('endpoint_forecast_arima', max_size=1)(_endpoint_forecast('arima'))
+benchmark('endpoint_forecast_batch', max_size=1)(_endpoint_forecast('batch'))
+
+
+@benchmark('endpoint_forecast_arima_cold', max_size=1, repeat=1)
+def _endpoint_forecast_cold(size):
+    from app import arima_model, forecast_engine
+    from models.order_selection import OrderSelector
+    _app_client()
+    # One in-process series loads the model libraries in this process, so every
+    # run's fresh pool inherits them whichever benchmarks ran before
+    _post('/api/forecast', {'sku_ids': ALL_SKUS[:1], 'store_ids': ALL_STORES[:1], 'forecast_days': FORECAST_DAYS})
+    body = {'sku_ids': ALL_SKUS, 'store_ids': ALL_STORES, 'forecast_days': FORECAST_DAYS}
+
+    def run():
+        # Fitted models and order search warm starts live in this process and in
+        # the pool workers, so reset both
+        forecast_engine.shutdown()
+        arima_model.models.clear()
+        arima_model.order_selector = OrderSelector()
+        _post('/api/forecast', body)
+    return run
+
+
+@benchmark('endpoint_simulation_payload', max_size=1)
+def _endpoint_simulation_payload(size):
+    _app_client()
+    forecast = _forecast_response(len(ALL_SKUS) * len(ALL_STORES))
+    body = {'base_forecast': forecast, 'scenario': {'price_change': 10, 'promotion_impact': 1.2}}
+    return lambda: _post('/api/simulation', body)
+
+
+@benchmark('endpoint_simulation_by_id', max_size=1)
+def _endpoint_simulation_by_id(size):
+    _app_client()
+    forecast_id = _post('/api/forecast', {'sku_ids': ALL_SKUS, 'store_ids': ALL_STORES,
+                                          'forecast_days': FORECAST_DAYS, 'model_type': 'batch'})['forecast_id']
+    body = {'forecast_id': forecast_id, 'scenario_grid': {'price_change': [-10, 0, 10], 'promotion_impact': [1.0, 1.2]}}
+    return lambda: _post('/api/simulation', body)
+
+
+@benchmark('endpoint_inventory_suggestions', max_size=1)
+def _endpoint_inventory(size):
+    _app_client()
+    forecast = _forecast_response(len(ALL_SKUS) * len(ALL_STORES))
+    inventory = {key: 150 for key in forecast['forecasts']}
+    body = {'forecasts': forecast, 'current_inventory': inventory}
+    return lambda: _post('/api/inventory-suggestions', body)
+
+
+# --- Runner -----------------------------------------------------------------
+
+def _silenced(fn):
+    """Run fn with stdout discarded; the app and models print progress per series"""
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            return fn()
+        finally:
+            sys.stdout = stdout
+
+
+def run_benchmarks(names, sizes, repeat):
+    results = {}
+    for name in names:
+        spec = BENCHMARKS[name]
+        results[name] = {}
+        for size in sizes:
+            if spec['max_size'] is not None and size > spec['max_size']:
+                continue
+            fn = _silenced(lambda: spec['setup'](size))
+            runs = spec['repeat'] or repeat
+            if runs > 1:
+                # Untimed warm-up so repeats measure the steady state (caches, trained network)
+                _silenced(fn)
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                _silenced(fn)
+                timings.append(time.perf_counter() - started)
+            results[name][str(size)] = {
+                'median': statistics.median(timings),
+                'min': min(timings),
+                'runs': len(timings)
+            }
+            print(f"{name:34s} {size:>6d}  median {results[name][str(size)]['median'] * 1000:10.2f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print per-benchmark ratios against the baseline; return the regressions"""
+    regressions = []
+    print(f"\n{'benchmark':34s} {'size':>6s} {'baseline ms':>12s} {'current ms':>12s} {'ratio':>7s}")
+    for name, by_size in results.items():
+        for size, current in by_size.items():
+            previous = baseline.get('results', {}).get(name, {}).get(size)
+            if previous is None or not previous['median']:
+                continue
+            ratio = current['median'] / previous['median']
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  REGRESSION'
+                regressions.append({'benchmark': name, 'size': size, 'ratio': ratio})
+            print(f"{name:34s} {size:>6s} {previous['median'] * 1000:12.2f} {current['median'] * 1000:12.2f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the backend benchmark suite')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES), help='Series counts for micro-benchmarks')
+    parser.add_argument('--only', nargs='+', default=None, help='Benchmark names or prefixes to run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help='Write results JSON here')
+    parser.add_argument('--compare', default=None, help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before flagging, as a fraction')
+    parser.add_argument('--list', action='store_true', help='List benchmark names and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    names = [name for name in BENCHMARKS
+             if args.only is None or any(name.startswith(prefix) for prefix in args.only)]
+    results = run_benchmarks(names, sorted(set(args.sizes)), args.repeat)
+    output = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': SEED
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+        print('\nNo regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Memory per gunicorn worker, with and without preloading
+
+Starts ``gunicorn -c gunicorn.conf.py wsgi:app`` for each worker count and
+mode, sends forecast, simulation and inventory traffic, then reads
+``/proc/<pid>/smaps_rollup`` (Linux) for the master, every worker and every
+process below the workers (the forecast process pools). USS is memory only
+that process holds; PSS splits shared pages between the processes sharing
+them, so the PSS total is what the deployment really uses. Any failed
+request aborts the run, since a failing server would be measured idle.
+
+    cd backend
+    python -m benchmarks.serving_memory --workers 1 2 4 --modes preload no-preload
+    python -m benchmarks.serving_memory --workers 2 --forecast-workers 2
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKUS = ['SKU001', 'SKU002', 'SKU003', 'SKU004', 'SKU005']
+STORES = ['STORE001', 'STORE002', 'STORE003']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _memory(pid):
+    """{'rss', 'pss', 'uss'} in MiB from smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0) / 1024,
+        'pss': fields.get('Pss', 0) / 1024,
+        'uss': (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024
+    }
+
+
+def _children(pid):
+    # Children are listed under the thread that forked them, e.g. a request thread
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children += [int(child) for child in f.read().split()]
+        except FileNotFoundError:
+            pass  # the thread exited
+    return children
+
+
+def _descendants(pid):
+    found = []
+    for child in _children(pid):
+        found += [child] + _descendants(child)
+    return found
+
+
+def _traffic(url, rounds, concurrency):
+    """Forecasts for every model, then simulation and inventory by forecast_id
+
+    Every call uses a new connection so follow-ups reach other workers too;
+    raises when any request did not answer 200.
+    """
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def call(path, body, timeout):
+        try:
+            response = requests.post(f"{url}{path}", json=body, timeout=timeout, headers={'Connection': 'close'})
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        with lock:
+            statuses[(path, status)] += 1
+        return response.json() if status == 200 else None
+
+    def planner():
+        for _ in range(rounds):
+            for model_type in ('arima', 'batch', 'lstm'):
+                forecast = call('/api/forecast', {
+                    'sku_ids': SKUS, 'store_ids': STORES, 'forecast_days': 30, 'model_type': model_type
+                }, 300)
+                if forecast is None:
+                    continue
+                call('/api/simulation', {'forecast_id': forecast['forecast_id'], 'scenario': {'promotion_impact': 1.2}}, 60)
+                call('/api/inventory-suggestions', {'forecast_id': forecast['forecast_id'], 'current_inventory': {}}, 60)
+
+    threads = [threading.Thread(target=planner) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    failed = {f"{path} {status}": count for (path, status), count in statuses.items() if status != 200}
+    if failed:
+        raise RuntimeError(f"Traffic had failed requests: {failed}")
+
+
+def measure(workers, preload, threads, rounds, forecast_workers=None):
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               GUNICORN_PRELOAD='1' if preload else '0', GUNICORN_ACCESS_LOG='', FORECAST_STORE_PATH='')
+    if forecast_workers is not None:
+        env['FORECAST_WORKERS'] = str(forecast_workers)
+    else:
+        # gunicorn.conf.py sizes the pools unless FORECAST_WORKERS is already set
+        env.pop('FORECAST_WORKERS', None)
+    started = time.time()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {server.returncode}")
+            if time.time() - started > 300:
+                raise RuntimeError('gunicorn did not become healthy within 300s')
+            try:
+                if requests.get(f"{url}/api/health", timeout=2).ok and len(_children(server.pid)) == workers:
+                    break
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        ready = time.time() - started
+
+        _traffic(url, rounds, workers * threads)
+        master = _memory(server.pid)
+        worker_pids = _children(server.pid)
+        per_worker = [_memory(pid) for pid in worker_pids]
+        pool = [_memory(pid) for worker_pid in worker_pids for pid in _descendants(worker_pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    everything = [master] + per_worker + pool
+    return {
+        'workers': workers,
+        'preload': preload,
+        'forecast_workers': forecast_workers,
+        'ready_seconds': ready,
+        'master': master,
+        'worker_mean': {name: sum(worker[name] for worker in per_worker) / len(per_worker)
+                        for name in ('rss', 'pss', 'uss')},
+        'pool_processes': len(pool),
+        'pool_pss': sum(process['pss'] for process in pool),
+        'pool_uss': sum(process['uss'] for process in pool),
+        'total_pss': sum(process['pss'] for process in everything),
+        'total_uss': sum(process['uss'] for process in everything)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--modes', nargs='+', choices=['preload', 'no-preload'], default=['preload', 'no-preload'])
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=2, help='forecast/simulation/inventory rounds per client')
+    parser.add_argument('--forecast-workers', type=int, default=None,
+                        help='FORECAST_WORKERS per web worker (default: CPU count / workers, as gunicorn.conf.py)')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print('serving_memory needs Linux /proc/<pid>/smaps_rollup')
+        return 2
+
+    print(f"{'mode':11s} {'workers':>7s} {'ready s':>8s} {'worker RSS':>11s} {'worker PSS':>11s} "
+          f"{'worker USS':>11s} {'pool procs':>10s} {'pool USS':>9s} {'total PSS':>10s}   (MiB)")
+    results = []
+    for mode in args.modes:
+        for workers in args.workers:
+            result = measure(workers, mode == 'preload', args.threads, args.rounds, args.forecast_workers)
+            results.append(result)
+            mean = result['worker_mean']
+            print(f"{mode:11s} {workers:7d} {result['ready_seconds']:8.1f} {mean['rss']:11.1f} {mean['pss']:11.1f} "
+                  f"{mean['uss']:11.1f} {result['pool_processes']:10d} {result['pool_uss']:9.1f} "
+                  f"{result['total_pss']:10.1f}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
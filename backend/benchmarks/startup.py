@@ -0,0 +1,116 @@
+"""Cold-start profile of the backend
+
+Each run starts a fresh interpreter with ``-X importtime``, imports the app,
+answers one /api/health request through the test client and, unless
+``--no-forecast`` is given, one /api/forecast request (where the lazily
+imported model libraries are loaded). Reports the median timings across runs
+and, from the last run, the slowest modules and top-level packages to import.
+
+    cd backend
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 25 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+assert client.get('/api/health').status_code == 200
+healthy = time.perf_counter()
+forecast = None
+if sys.argv[1] == '1':
+    response = client.post('/api/forecast', json={'sku_ids': ['SKU001'], 'store_ids': ['STORE001'], 'forecast_days': 30})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    forecast = time.perf_counter() - healthy
+sys.stdout = sys.__stdout__
+print('STARTUP ' + json.dumps({'import': imported - started, 'health': healthy - started, 'first_forecast': forecast}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(module, self seconds, cumulative seconds, depth)] from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return modules
+
+
+def run_once(forecast):
+    env = dict(os.environ, MODEL_CACHE_DIR='', FORECAST_STORE_PATH='', FORECAST_JOB_STORE_PATH='',
+               FORECAST_RESULT_STORE_PATH='', HOT_KEYS_PATH='', PYTHONPATH=BACKEND_DIR)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE, '1' if forecast else '0'],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    line = next(line for line in result.stdout.splitlines() if line.startswith('STARTUP '))
+    timings = json.loads(line[len('STARTUP '):])
+    timings['process'] = wall
+    return timings, parse_importtime(result.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='slowest modules and packages to list')
+    parser.add_argument('--no-forecast', action='store_true', help='skip the first /api/forecast request')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    runs = []
+    modules = []
+    for _ in range(args.runs):
+        timings, modules = run_once(not args.no_forecast)
+        runs.append(timings)
+
+    summary = {name: statistics.median(run[name] for run in runs)
+               for name in ('import', 'health', 'first_forecast', 'process') if runs[0][name] is not None}
+    print(f"median of {len(runs)} runs")
+    print(f"  import app               {summary['import'] * 1000:8.1f} ms")
+    print(f"  first /api/health        {summary['health'] * 1000:8.1f} ms  (from the start of the import)")
+    if 'first_forecast' in summary:
+        print(f"  first /api/forecast      {summary['first_forecast'] * 1000:8.1f} ms  (includes lazy imports and the fit)")
+    print(f"  whole process            {summary['process'] * 1000:8.1f} ms")
+
+    packages = defaultdict(float)
+    for name, self_seconds, _, _ in modules:
+        packages[name.split('.')[0]] += self_seconds
+    slowest = sorted(modules, key=lambda module: module[2], reverse=True)[:args.top]
+    print("\nslowest imports (cumulative, last run)")
+    for name, _, cumulative, depth in slowest:
+        print(f"  {cumulative * 1000:8.1f} ms  {'  ' * depth}{name}")
+    print("\nslowest packages (self time summed, last run)")
+    for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'runs': runs,
+                'median': summary,
+                'modules': [{'name': name, 'self': s, 'cumulative': c, 'depth': d} for name, s, c, d in modules],
+                'packages': dict(packages)
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Gunicorn settings for the forecasting backend
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment. Threads serve the
+I/O-bound endpoints inside each worker; per-series model fitting is spread
+over the forecast engine's own process pool, which is sized so that all
+workers' pools together use about one process per CPU.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Load the app and its warm state once in the master, then fork (see wsgi.py)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+os.environ.setdefault('FORECAST_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+def post_fork(server, worker):
+    # Counters recorded while preloading belong to the master, not to each worker
+    from utils.metrics import metrics
+    metrics.after_fork()
+
+
+def post_worker_init(worker):
+    # Only the first worker warms up; the others find its fits in the on-disk model cache
+    if worker.age == 1:
+        from app import warmup
+        warmup.start()
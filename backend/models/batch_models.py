@@ -0,0 +1,181 @@
+import numpy as np
+
+# z-score for the 95% interval that ARIMAModel.predict reports
+Z_95 = 1.959963984540054
+
+SEASON_LENGTH = 7
+
+# Smoothing parameter grid searched for every series at once
+HW_ALPHAS = (0.1, 0.2, 0.3, 0.5)
+HW_BETAS = (0.0, 0.05)
+HW_GAMMAS = (0.05, 0.1, 0.3)
+
+
+def stack_series(historical_data, keys):
+    """Build a (series x days) matrix from get_historical_data output
+
+    Series are right-aligned on their most recent day and truncated to the
+    shortest history so every row covers the same dates.
+    """
+    length = min(len(historical_data[key]['sales']) for key in keys)
+    matrix = np.empty((len(keys), length), dtype=np.float64)
+    for row, key in enumerate(keys):
+        sales = historical_data[key]['sales']
+        matrix[row] = np.asarray(sales[len(sales) - length:], dtype=np.float64)
+    return matrix
+
+
+class BatchForecaster:
+    """Vectorized AR(1) and additive Holt-Winters forecasts for many series
+
+    Every series is fitted with both a least-squares AR(1) with intercept and
+    a weekly-seasonal Holt-Winters model (parameters picked from a small grid
+    by in-sample SSE); the model with the lower AIC is used per series. All
+    fitting runs as NumPy operations over the whole (series x days) matrix.
+    """
+
+    def __init__(self, season_length=SEASON_LENGTH):
+        self.season_length = season_length
+
+    def predict(self, sales, forecast_days=30):
+        """Forecast every row of sales, returning one predict()-shaped dict per row"""
+        sales = np.asarray(sales, dtype=np.float64)
+        if sales.ndim == 1:
+            sales = sales[np.newaxis, :]
+        n_series, n_days = sales.shape
+
+        if n_days < 3:
+            mean = sales.mean(axis=1, keepdims=True) if n_days else np.zeros((n_series, 1))
+            point = np.repeat(mean, forecast_days, axis=1)
+            return self._to_results(point, point * 0.8, point * 1.2, ['Batch Mean'] * n_series,
+                                    [{} for _ in range(n_series)])
+
+        ar_point, ar_std, ar_aic, ar_params = self._ar1(sales, forecast_days)
+
+        if n_days >= 2 * self.season_length:
+            hw_point, hw_std, hw_aic, hw_params = self._holt_winters(sales, forecast_days)
+            use_hw = hw_aic < ar_aic
+        else:
+            hw_point, hw_std, hw_params = ar_point, ar_std, ar_params
+            use_hw = np.zeros(n_series, dtype=bool)
+
+        point = np.where(use_hw[:, None], hw_point, ar_point)
+        std = np.where(use_hw[:, None], hw_std, ar_std)
+        model_types = np.where(use_hw, 'Batch Holt-Winters', 'Batch AR(1)')
+        params = [hw_params[i] if use_hw[i] else ar_params[i] for i in range(n_series)]
+
+        return self._to_results(point, point - Z_95 * std, point + Z_95 * std, model_types, params)
+
+    def predict_many(self, series, forecast_days=30):
+        """Forecast 1-D sales arrays of any lengths, one vectorized pass per distinct length
+
+        Series that started later (a newly listed SKU) are fitted on their own
+        history instead of cutting every other series down to it.
+        """
+        by_length = {}
+        for index, sales in enumerate(series):
+            by_length.setdefault(len(sales), []).append(index)
+        results = [None] * len(series)
+        for rows in by_length.values():
+            matrix = np.array([series[index] for index in rows], dtype=np.float64).reshape(len(rows), -1)
+            for index, result in zip(rows, self.predict(matrix, forecast_days)):
+                results[index] = result
+        return results
+
+    def _ar1(self, sales, forecast_days):
+        """Closed-form OLS fit of y_t = c + phi * y_{t-1} for every row"""
+        x, y = sales[:, :-1], sales[:, 1:]
+        n = x.shape[1]
+        x_mean = x.mean(axis=1, keepdims=True)
+        y_mean = y.mean(axis=1, keepdims=True)
+        x_dev = x - x_mean
+        var_x = (x_dev ** 2).sum(axis=1, keepdims=True)
+        cov_xy = (x_dev * (y - y_mean)).sum(axis=1, keepdims=True)
+        phi = np.divide(cov_xy, var_x, out=np.zeros_like(cov_xy), where=var_x > 0)
+        # Clip to the stationary region so long horizons stay bounded
+        phi = np.clip(phi, -0.99, 0.99)
+        c = y_mean - phi * x_mean
+
+        residuals = y - (c + phi * x)
+        sse = (residuals ** 2).sum(axis=1)
+        sigma2 = sse / max(n - 2, 1)
+
+        steps = np.arange(1, forecast_days + 1)
+        phi_h = phi ** steps
+        # Iterating y_{t+1} = c + phi * y_t gives a closed form for every horizon
+        mean = np.divide(c, 1 - phi, out=np.zeros_like(c), where=np.abs(1 - phi) > 1e-12)
+        point = mean + phi_h * (sales[:, -1:] - mean)
+        # Var of the h-step error is sigma2 * sum_{j<h} phi^(2j)
+        std = np.sqrt(sigma2[:, None] * np.cumsum(np.hstack([np.ones_like(phi), phi_h[:, :-1] ** 2]), axis=1))
+
+        aic = n * np.log(np.maximum(sse / n, 1e-12)) + 2 * 3
+        params = [{'intercept': float(c[i, 0]), 'phi': float(phi[i, 0]), 'sigma2': float(sigma2[i])}
+                  for i in range(len(sales))]
+        return point, std, aic, params
+
+    def _holt_winters(self, sales, forecast_days):
+        """Additive Holt-Winters over a parameter grid, vectorized across grid and series"""
+        m = self.season_length
+        n_series, n_days = sales.shape
+        grid = np.array([(a, b, g) for a in HW_ALPHAS for b in HW_BETAS for g in HW_GAMMAS])
+        alpha, beta, gamma = (grid[:, i][:, None] for i in range(3))  # (G, 1) each
+
+        first, second = sales[:, :m].mean(axis=1), sales[:, m:2 * m].mean(axis=1)
+        level = np.broadcast_to(first, (len(grid), n_series)).copy()
+        trend = np.broadcast_to((second - first) / m, (len(grid), n_series)).copy()
+        # Seasonal states are stored slot-major so each step touches contiguous memory
+        season = np.broadcast_to((sales[:, :m] - first[:, None]).T[:, None, :], (m, len(grid), n_series)).copy()
+
+        sse = np.zeros((len(grid), n_series))
+        by_day = np.ascontiguousarray(sales.T)  # contiguous rows for the time loop
+        for t in range(n_days):
+            slot = t % m
+            y = by_day[t]
+            error = y - (level + trend + season[slot])
+            sse += error ** 2
+            new_level = alpha * (y - season[slot]) + (1 - alpha) * (level + trend)
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            season[slot] = gamma * (y - new_level) + (1 - gamma) * season[slot]
+            level = new_level
+
+        best = sse.argmin(axis=0)
+        cols = np.arange(n_series)
+        level, trend, season = level[best, cols], trend[best, cols], season[:, best, cols].T
+        a, b, g = grid[best].T
+        best_sse = sse[best, cols]
+        sigma2 = best_sse / n_days
+
+        steps = np.arange(1, forecast_days + 1)
+        slots = (n_days + steps - 1) % m
+        point = level[:, None] + steps * trend[:, None] + season[:, slots]
+
+        # Var of the h-step error is sigma2 * (1 + sum_{j<h} c_j^2) with
+        # c_j = alpha * (1 + j * beta) + gamma * [j is a multiple of m]
+        j = steps[:-1]
+        c = a[:, None] * (1 + j * b[:, None]) + g[:, None] * (j % m == 0)
+        var_factor = np.hstack([np.ones((n_series, 1)), 1 + np.cumsum(c ** 2, axis=1)])
+        std = np.sqrt(sigma2[:, None] * var_factor)
+
+        aic = n_days * np.log(np.maximum(best_sse / n_days, 1e-12)) + 2 * 4
+        params = [{'alpha': float(a[i]), 'beta': float(b[i]), 'gamma': float(g[i]), 'sigma2': float(sigma2[i])}
+                  for i in range(n_series)]
+        return point, std, aic, params
+
+    def _to_results(self, point, lower, upper, model_types, params):
+        point = np.maximum(0, point)
+        lower = np.maximum(0, lower)
+        upper = np.maximum(0, upper)
+        return [
+            {
+                'forecast': point[i].tolist(),
+                'confidence_interval': {
+                    'lower': lower[i].tolist(),
+                    'upper': upper[i].tolist()
+                },
+                'feature_importance': {
+                    'model_type': str(model_types[i]),
+                    'parameters': params[i]
+                }
+            }
+            for i in range(len(point))
+        ]
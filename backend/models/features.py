@@ -0,0 +1,142 @@
+import os
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+WEATHER_COLUMNS = ['temperature', 'rain', 'cloudy']
+# Simulated temperatures span 15-35C; centre and scale them so coefficients are comparable
+TEMPERATURE_CENTER = 25.0
+TEMPERATURE_SCALE = 10.0
+
+
+class FeatureBuilder:
+    """Exogenous regressors for ARIMA, built as aligned NumPy design matrices
+
+    Each series gets one row per history day and per forecast day with the
+    log holiday impact for its SKU (from ``HolidayAPI.holidays``) and its
+    store's scaled temperature and rain/cloudy indicators (clear is the
+    baseline), unless ``weather`` is off. Holiday rows are computed once per
+    SKU and weather blocks once per store, then stacked per series. Columns
+    that are constant over the history are dropped because their coefficients
+    cannot be estimated.
+    """
+
+    def __init__(self, holidays, weather=True):
+        self.holidays = holidays
+        self.weather = weather
+
+    def holiday_matrix(self, sku_ids, dates):
+        """(len(sku_ids) x days) log holiday impact, 0 outside holidays"""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        impacts = np.zeros((len(sku_ids), len(dates)))
+        for date_str, holiday in self.holidays.items():
+            columns = np.nonzero(dates == np.datetime64(date_str, 'D'))[0]
+            if len(columns):
+                impact = holiday.get('impact', {})
+                impacts[:, columns[0]] = np.log([impact.get(sku_id, 1.0) for sku_id in sku_ids])
+        return impacts
+
+    def weather_block(self, days, dates):
+        """(days x 3) weather features for a store, aligned to dates by day
+
+        Days without a weather record take the mean of the days that have one.
+        """
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        block = np.full((len(dates), len(WEATHER_COLUMNS)), np.nan)
+        if days:
+            day_dates = np.array([day['date'] for day in days], dtype='datetime64[D]')
+            rows = (day_dates - dates[0]).astype(np.int64)
+            valid = (rows >= 0) & (rows < len(dates))
+            conditions = np.array([day.get('weather_condition') for day in days], dtype=object)
+            values = np.column_stack([
+                (np.array([day.get('temperature', TEMPERATURE_CENTER) for day in days], dtype=float)
+                 - TEMPERATURE_CENTER) / TEMPERATURE_SCALE,
+                conditions == 'rain',
+                conditions == 'cloudy'
+            ])
+            block[rows[valid]] = values[valid]
+        means = np.nanmean(block, axis=0) if np.isfinite(block).any() else np.zeros(len(WEATHER_COLUMNS))
+        return np.where(np.isnan(block), np.nan_to_num(means), block)
+
+    def build(self, historical_data, weather, forecast_days):
+        """{key: (exog, future_exog, columns)} for series sharing one date index
+
+        ``weather`` maps store_id to day dicts covering the history and the
+        forecast horizon.
+        """
+        groups = defaultdict(list)
+        for key, data in historical_data.items():
+            dates = np.asarray(data['date'], dtype='datetime64[D]')
+            groups[(dates[0], len(dates))].append(key)
+
+        features = {}
+        for (start, n_days), keys in groups.items():
+            all_dates = start + np.arange(n_days + forecast_days)
+            sku_ids = sorted({historical_data[key]['sku_id'] for key in keys})
+            sku_rows = {sku_id: row for row, sku_id in enumerate(sku_ids)}
+            holidays = self.holiday_matrix(sku_ids, all_dates)
+            stores = {}
+
+            names = ['holiday'] + WEATHER_COLUMNS if self.weather else ['holiday']
+            for key in keys:
+                data = historical_data[key]
+                store_id = data['store_id']
+                matrix = holidays[sku_rows[data['sku_id']]][:, None]
+                if self.weather:
+                    if store_id not in stores:
+                        stores[store_id] = self.weather_block(weather.get(store_id, []), all_dates)
+                    matrix = np.column_stack([matrix, stores[store_id]])
+
+                keep = np.ptp(matrix[:n_days], axis=0) > 0
+                columns = [name for name, kept in zip(names, keep) if kept]
+                if not columns:
+                    features[key] = (None, None, [])
+                    continue
+                features[key] = (matrix[:n_days, keep], matrix[n_days:, keep], columns)
+        return features
+
+    def attach(self, historical_data, weather, forecast_days):
+        """Store each series' exog, future_exog and exog_columns in its data dict"""
+        for key, (exog, future_exog, columns) in self.build(historical_data, weather, forecast_days).items():
+            data = historical_data[key]
+            data['exog'] = exog
+            data['future_exog'] = future_exog
+            data['exog_columns'] = columns
+        return historical_data
+
+
+def forecast_start(historical_data):
+    """The day after the latest history day, where the forecast horizon starts"""
+    if not historical_data:
+        return None
+    last = max(np.datetime64(data['date'][-1], 'D') for data in historical_data.values())
+    return (last + 1).astype(date)
+
+
+def attach_features(historical_data, weather_api, holidays, forecast_days, weather_forecast=None, weather=None):
+    """Attach exog for every series from holidays and, when enabled, weather
+
+    ``weather_forecast`` must start the day after the history ends (see
+    ``forecast_start``). Weather regressors are off unless ``weather`` or
+    FORECAST_WEATHER_REGRESSORS=1 turns them on: past weather is simulated
+    until a weather history source is configured, and fitting on it only
+    adds noise.
+    """
+    if not historical_data:
+        return historical_data
+    if weather is None:
+        weather = os.environ.get('FORECAST_WEATHER_REGRESSORS', '0') == '1'
+    if not weather:
+        return FeatureBuilder(holidays, weather=False).attach(historical_data, {}, forecast_days)
+    store_ids = sorted({data['store_id'] for data in historical_data.values()})
+    # Series end on the same day but may start later, so the longest covers them all
+    dates = max((data['date'] for data in historical_data.values()), key=len)
+    if weather_forecast is None:
+        weather_forecast = weather_api.get_weather_forecast(store_ids, forecast_days, forecast_start(historical_data))
+    weather_history = weather_api.get_weather_history(store_ids, dates)
+    # Observed days come last so they win over forecasts for the same day,
+    # which keeps the history regressors (and the model fingerprint) stable
+    weather = {store_id: weather_forecast.get(store_id, []) + weather_history.get(store_id, [])
+               for store_id in store_ids}
+    return FeatureBuilder(holidays).attach(historical_data, weather, forecast_days)
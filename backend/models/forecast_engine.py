@@ -0,0 +1,294 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from models.batch_models import BatchForecaster
+from models.forecasting_models import ARIMAModel, LSTMModel
+from utils.metrics import metrics
+
+# Models owned by a pool worker process; each worker keeps its own fitted state
+# from there on
+_worker_models = {}
+
+
+class SeriesTimeout(BaseException):
+    """Raised when a single series exceeds its forecasting time budget
+
+    Derives from BaseException so the broad ``except Exception`` handlers in
+    the models cannot swallow it halfway through a fit.
+    """
+
+
+def _init_worker(models):
+    # Forked workers inherit the parent's metrics; drop them so only the
+    # worker's own measurements are sent back and merged
+    metrics.after_fork()
+    # ...and, with the fork start method, its models, including fits preloaded
+    # before gunicorn forked and the trained LSTM
+    for key, model in models.items():
+        model.after_fork()
+        _worker_models[key] = model
+
+
+def _get_worker_model(model_type):
+    key = 'lstm' if model_type == 'lstm' else 'arima'
+    if key not in _worker_models:
+        _worker_models[key] = LSTMModel() if key == 'lstm' else ARIMAModel()
+    return _worker_models[key]
+
+
+def _raise_timeout(signum, frame):
+    raise SeriesTimeout()
+
+
+def _can_use_alarm():
+    """SIGALRM only exists on Unix and can only be armed from the main thread"""
+    return hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+
+
+def _entry(task, forecast):
+    entry = {
+        'sku_id': task['sku_id'],
+        'store_id': task['store_id'],
+        'forecast': forecast['forecast'],
+        'confidence_interval': forecast.get('confidence_interval', {}),
+        'feature_importance': forecast.get('feature_importance', {})
+    }
+    for optional in ('intervals', 'quantiles'):
+        if optional in forecast:
+            entry[optional] = forecast[optional]
+    return entry
+
+
+def _timeout_entry(model, task, forecast_days):
+    """Fallback entry for a series that ran past its time budget"""
+    forecast = model._simple_forecast(task['data'], forecast_days)
+    forecast.setdefault('feature_importance', {})['timed_out'] = True
+    return _entry(task, forecast)
+
+
+def _error_entry(task, forecast_days, error):
+    return {
+        'sku_id': task['sku_id'],
+        'store_id': task['store_id'],
+        'forecast': [50] * forecast_days,  # Simple fallback
+        'confidence_interval': {
+            'lower': [40] * forecast_days,
+            'upper': [60] * forecast_days
+        },
+        'feature_importance': {
+            'model_type': 'Fallback',
+            'error': str(error)
+        }
+    }
+
+
+def is_fallback(entry):
+    """True for entries that stand in for a forecast that failed or timed out
+
+    These are retried on the next request rather than stored: the error
+    fallback, series past their time budget, and the simple forecasts models
+    fall back to when fitting fails (marked with ``fallback_reason``).
+    """
+    feature_importance = entry.get('feature_importance', {})
+    return (feature_importance.get('model_type') == 'Fallback' or bool(feature_importance.get('timed_out'))
+            or bool(feature_importance.get('fallback_reason')))
+
+
+def _model_label(model):
+    return type(model).__name__.replace('Model', '').lower()
+
+
+def forecast_series(model, task, forecast_days, series_timeout=None):
+    """Forecast one SKU/store series, falling back to a simple forecast on timeout"""
+    label = _model_label(model)
+    use_alarm = bool(series_timeout) and _can_use_alarm()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, series_timeout)
+    start = time.perf_counter()
+    try:
+        forecast = model.predict(
+            task['data'],
+            task.get('weather'),
+            task.get('holidays'),
+            forecast_days
+        )
+        metrics.inc('forecast_series_total', model=label, outcome='ok')
+        return _entry(task, forecast)
+    except SeriesTimeout:
+        metrics.inc('forecast_series_total', model=label, outcome='timeout')
+        return _timeout_entry(model, task, forecast_days)
+    except Exception as e:
+        metrics.inc('forecast_series_total', model=label, outcome='error')
+        print(f"Error generating forecast for {task['key']}: {str(e)}")
+        return _error_entry(task, forecast_days, e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        metrics.observe('forecast_series_seconds', time.perf_counter() - start, model=label)
+
+
+def _run_chunk(model_type, chunk, forecast_days, series_timeout):
+    """Pool entry point: forecast a chunk of series inside a worker process
+
+    Returns the entries together with the metrics the worker recorded, so
+    the parent process can merge them into its own registry.
+    """
+    model = _get_worker_model(model_type)
+    entries = [forecast_series(model, task, forecast_days, series_timeout) for task in chunk]
+    return entries, metrics.drain()
+
+
+class ForecastEngine:
+    """Fans per-series model fitting and prediction out across a process pool"""
+
+    def __init__(self, models=None, max_workers=None, chunk_size=None,
+                 series_timeout=None, min_parallel_series=None):
+        # Models used when a request is small enough to run in-process
+        self.models = models or {}
+        self.max_workers = max_workers or int(os.environ.get('FORECAST_WORKERS', os.cpu_count() or 1))
+        self.chunk_size = chunk_size or int(os.environ.get('FORECAST_CHUNK_SIZE', 0))
+        self.series_timeout = series_timeout or float(os.environ.get('FORECAST_SERIES_TIMEOUT', 30))
+        self.min_parallel_series = min_parallel_series or int(os.environ.get('FORECAST_PARALLEL_MIN_SERIES', 4))
+        self.batch_forecaster = BatchForecaster()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Runs inline series off the request thread when SIGALRM cannot be armed there
+        self._inline_executor = ThreadPoolExecutor(thread_name_prefix='forecast-inline')
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # Forked workers get the models as they are; other start methods
+                # would have to pickle them, so those workers build their own
+                inherit = multiprocessing.get_start_method() == 'fork'
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                 initargs=(dict(self.models) if inherit else {},))
+            return self._pool
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def shutdown(self):
+        self._reset_pool()
+
+    def _local_model(self, model_type):
+        key = 'lstm' if model_type == 'lstm' else 'arima'
+        if key not in self.models:
+            self.models[key] = LSTMModel() if key == 'lstm' else ARIMAModel()
+        return self.models[key]
+
+    def _chunks(self, tasks):
+        size = self.chunk_size
+        if size <= 0:
+            # Roughly four chunks per worker keeps the pool busy without
+            # paying per-series pickling and scheduling overhead
+            size = max(1, -(-len(tasks) // (self.max_workers * 4)))
+        return [(start, tasks[start:start + size]) for start in range(0, len(tasks), size)]
+
+    def run(self, tasks, model_type, forecast_days):
+        """Forecast every task and return the entries in task order"""
+        results = [None] * len(tasks)
+        for index, entry in self.iter_run(tasks, model_type, forecast_days):
+            results[index] = entry
+        return results
+
+    def iter_run(self, tasks, model_type, forecast_days):
+        """Yield (task index, entry) pairs as soon as each series is forecast"""
+        if model_type in ('batch', 'lstm'):
+            yield from enumerate(self._run_vectorized(tasks, model_type, forecast_days))
+            return
+
+        if self.max_workers <= 1 or len(tasks) < self.min_parallel_series:
+            yield from self._iter_inline(tasks, model_type, forecast_days)
+            return
+
+        chunks = self._chunks(tasks)
+        try:
+            pool = self._get_pool()
+            futures = {
+                pool.submit(_run_chunk, model_type, chunk, forecast_days, self.series_timeout): (start, chunk)
+                for start, chunk in chunks
+            }
+        except BrokenProcessPool:
+            self._reset_pool()
+            yield from self._iter_inline(tasks, model_type, forecast_days)
+            return
+
+        # Workers enforce the per-series budget themselves; this deadline only
+        # catches a chunk whose worker is stuck outside Python bytecode.
+        # Chunks are queued behind each other, so the budget covers the whole batch.
+        rounds = -(-len(chunks) // self.max_workers)
+        largest = max(len(chunk) for _, chunk in chunks)
+        deadline = self.series_timeout * largest * rounds + 5
+
+        model = self._local_model(model_type)
+        try:
+            for future in as_completed(list(futures), timeout=deadline):
+                # Drop the future as soon as it is consumed so finished
+                # results are not held until the whole request completes
+                start, chunk = futures.pop(future)
+                try:
+                    entries, worker_metrics = future.result()
+                    metrics.merge(worker_metrics)
+                except BrokenProcessPool:
+                    self._reset_pool()
+                    entries = [forecast_series(model, task, forecast_days) for task in chunk]
+                except Exception as e:
+                    entries = [_error_entry(task, forecast_days, e) for task in chunk]
+                yield from enumerate(entries, start)
+        except FuturesTimeout:
+            for future, (start, chunk) in futures.items():
+                future.cancel()
+                yield from enumerate((_timeout_entry(model, task, forecast_days) for task in chunk), start)
+        finally:
+            # A client that stops reading a stream should not leave queued work behind
+            for future in futures:
+                future.cancel()
+
+    def _run_vectorized(self, tasks, model_type, forecast_days):
+        """Forecast all series in one vectorized pass"""
+        if not tasks:
+            return []
+        try:
+            with metrics.timer('forecast_vectorized_seconds', model=model_type):
+                if model_type == 'lstm':
+                    # The LSTM is a single global network, so it runs in-process
+                    forecasts = self._local_model('lstm').predict_many([task['data'] for task in tasks], forecast_days)
+                else:
+                    forecasts = self.batch_forecaster.predict_many([task['data']['sales'] for task in tasks], forecast_days)
+            metrics.inc('forecast_series_total', len(tasks), model=model_type, outcome='ok')
+            return [_entry(task, forecast) for task, forecast in zip(tasks, forecasts)]
+        except Exception as e:
+            metrics.inc('forecast_series_total', len(tasks), model=model_type, outcome='error')
+            print(f"Error in {model_type} forecast: {str(e)}")
+            return [_error_entry(task, forecast_days, e) for task in tasks]
+
+    def _iter_inline(self, tasks, model_type, forecast_days):
+        model = self._local_model(model_type)
+        if not self.series_timeout or _can_use_alarm():
+            for index, task in enumerate(tasks):
+                yield index, forecast_series(model, task, forecast_days, self.series_timeout)
+            return
+
+        # Request threads (threaded dev server, gunicorn gthread) cannot arm the
+        # alarm, so each series runs on a helper thread and is given up on once
+        # it exceeds its budget; the abandoned fit finishes in the background
+        for index, task in enumerate(tasks):
+            future = self._inline_executor.submit(forecast_series, model, task, forecast_days)
+            try:
+                entry = future.result(timeout=self.series_timeout)
+            except FuturesTimeout:
+                metrics.inc('forecast_series_total', model=_model_label(model), outcome='timeout')
+                entry = _timeout_entry(model, task, forecast_days)
+            yield index, entry
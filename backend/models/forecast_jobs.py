@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from models.forecast_engine import is_fallback
+from utils.job_store import FINISHED_STATES
+
+
+class ForecastJob:
+    """State of one queued forecast run"""
+
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.total = 0
+        self.completed = 0
+        self.fallbacks = 0
+        self.error = None
+        self.result = None
+        self.cancel_requested = threading.Event()
+
+    @classmethod
+    def from_row(cls, row):
+        """Job rebuilt from a JobStore row"""
+        job = cls(row['job_id'], row['params'])
+        for name in ('status', 'created_at', 'started_at', 'finished_at', 'total', 'completed', 'fallbacks', 'error'):
+            setattr(job, name, row[name])
+        job.result = row.get('result')
+        if row['cancel_requested']:
+            job.cancel_requested.set()
+        return job
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'progress': {
+                'total': self.total,
+                'completed': self.completed,
+                'fallbacks': self.fallbacks,
+                'percent': round(100 * self.completed / self.total, 1) if self.total else 0.0
+            },
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+
+
+class ForecastJobManager:
+    """Runs large forecast requests in the background behind a job API
+
+    Jobs wait in the thread pool's queue, are executed through the forecast
+    engine series by series so progress can be polled and cancellation takes
+    effect between series, and finished jobs are kept for ``retention_seconds``
+    up to ``max_retained`` jobs.
+
+    With a ``store`` (a JobStore) the job state lives in SQLite, so any server
+    process can answer polls and cancels for a job another process runs; the
+    running process writes progress and checks for cancellation at most every
+    ``progress_interval`` seconds. A heartbeat thread keeps this process's
+    queued and running jobs alive in the store; jobs without a heartbeat for
+    ``stale_seconds`` (their worker crashed or was restarted) are marked
+    failed. Without a store, jobs are only visible to the process that
+    accepted them.
+    """
+
+    def __init__(self, engine, max_concurrent_jobs=None, max_retained=None, retention_seconds=None,
+                 store=None, progress_interval=0.5, stale_seconds=None):
+        self.engine = engine
+        self.max_concurrent_jobs = max_concurrent_jobs or int(os.environ.get('FORECAST_JOB_WORKERS', 2))
+        self.max_retained = max_retained or int(os.environ.get('FORECAST_JOB_MAX_RETAINED', 100))
+        self.retention_seconds = retention_seconds or float(os.environ.get('FORECAST_JOB_RETENTION_SECONDS', 3600))
+        self.store = store
+        self.progress_interval = progress_interval
+        self.stale_seconds = stale_seconds or float(os.environ.get('FORECAST_JOB_STALE_SECONDS', 60))
+        self._heartbeat_thread = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_jobs, thread_name_prefix='forecast-job')
+        # Every job without a store; with one, only the jobs this process is running
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, build_tasks, model_type, forecast_days, params=None):
+        """Queue a job; build_tasks() is called on the worker to load its series"""
+        job = ForecastJob(uuid.uuid4().hex, params or {})
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        if self.store is not None:
+            self.store.create(job)
+            self._start_heartbeat()
+        self._executor.submit(self._run, job, build_tasks, model_type, forecast_days)
+        return job
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat, name='forecast-job-heartbeat',
+                                                          daemon=True)
+                self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        # Several beats per stale period, so one slow write cannot fail a live job
+        interval = max(0.1, self.stale_seconds / 6)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                job_ids = list(self._jobs)
+            try:
+                self.store.heartbeat(job_ids)
+            except Exception as e:
+                print(f"Forecast job heartbeat failed: {e}")
+
+    def get(self, job_id, include_result=False):
+        if self.store is not None:
+            self.store.fail_stale(self.stale_seconds)
+            row = self.store.get(job_id, include_result)
+            return ForecastJob.from_row(row) if row is not None else None
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel_requested.set()
+        if self.store is not None:
+            # The process running the job picks the flag up between series
+            return self.get(job_id) if self.store.request_cancel(job_id) else None
+        if job is None:
+            return None
+        with self._lock:
+            if job.status == 'queued':
+                self._finish(job, 'cancelled')
+        return job
+
+    def _run(self, job, build_tasks, model_type, forecast_days):
+        with self._lock:
+            if job.status != 'queued' or job.cancel_requested.is_set():
+                self._forget(job)
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+        if self.store is not None and not self.store.start(job):
+            self._forget(job)
+            return
+
+        reported_at = time.time()
+        try:
+            tasks = build_tasks()
+            job.total = len(tasks)
+            if self.store is not None and self.store.progress(job):
+                job.cancel_requested.set()
+            results = [None] * len(tasks)
+            iterator = self.engine.iter_run(tasks, model_type, forecast_days)
+            try:
+                for index, entry in iterator:
+                    results[index] = entry
+                    job.completed += 1
+                    if is_fallback(entry):
+                        job.fallbacks += 1
+                    if self.store is not None and time.time() - reported_at >= self.progress_interval:
+                        reported_at = time.time()
+                        if self.store.progress(job):
+                            job.cancel_requested.set()
+                    if job.cancel_requested.is_set():
+                        break
+            finally:
+                # Closing the iterator cancels chunks that have not started yet
+                iterator.close()
+
+            with self._lock:
+                if job.cancel_requested.is_set():
+                    self._finish(job, 'cancelled')
+                    return
+                job.result = {
+                    'forecasts': {task['key']: entry for task, entry in zip(tasks, results)},
+                    'model_used': model_type,
+                    'forecast_days': forecast_days
+                }
+                self._finish(job, 'completed')
+        except Exception as e:
+            print(f"Forecast job {job.id} failed: {str(e)}")
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, 'failed')
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        if self.store is not None:
+            self.store.finish(job)
+            self._forget(job)
+
+    def _forget(self, job):
+        if self.store is not None:
+            self._jobs.pop(job.id, None)
+
+    def _prune(self):
+        """Drop expired finished jobs, then the oldest finished ones over the limit"""
+        if self.store is not None:
+            self.store.fail_stale(self.stale_seconds)
+            self.store.prune(self.retention_seconds, self.max_retained)
+            return
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in FINISHED_STATES),
+            key=lambda job: job.finished_at
+        )
+        excess = len(self._jobs) - self.max_retained
+        for job in finished:
+            if now - job.finished_at > self.retention_seconds or excess > 0:
+                del self._jobs[job.id]
+                excess -= 1
@@ -0,0 +1,41 @@
+from models.features import attach_features, forecast_start
+from utils.metrics import metrics
+
+
+def build_forecast_tasks(processor, weather_api, holiday_api, keys, forecast_days):
+    """Load history and external factors and build one task per (sku_id, store_id) key
+
+    Shared by the API and the offline batch jobs, so precomputed forecasts are
+    made from the same inputs as live ones. Keys without history are skipped.
+    """
+    sku_ids = sorted({sku_id for sku_id, _ in keys})
+    store_ids = sorted({store_id for _, store_id in keys})
+
+    with metrics.timer('forecast_stage_seconds', stage='history'):
+        historical_data = processor.get_historical_data(sku_ids, store_ids)
+
+    # External factors, fetched once for all stores; the horizon starts the day after the history
+    with metrics.timer('forecast_stage_seconds', stage='weather'):
+        weather_data = weather_api.get_weather_forecast(store_ids, forecast_days, forecast_start(historical_data))
+    with metrics.timer('forecast_stage_seconds', stage='holidays'):
+        holiday_data = holiday_api.get_holidays(forecast_days)
+
+    # Weather and holiday regressors for ARIMA, built once per store and SKU
+    with metrics.timer('forecast_stage_seconds', stage='features'):
+        attach_features(historical_data, weather_api, holiday_api.holidays, forecast_days, weather_data)
+
+    tasks = []
+    for sku_id, store_id in keys:
+        key = f"{sku_id}_{store_id}"
+        if key not in historical_data:
+            metrics.inc('forecast_missing_series_total')
+            continue
+        tasks.append({
+            'key': key,
+            'sku_id': sku_id,
+            'store_id': store_id,
+            'data': historical_data[key],
+            'weather': weather_data.get(store_id, []),
+            'holidays': holiday_data
+        })
+    return tasks
@@ -1,88 +1,168 @@
-import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 # import tensorflow as tf
 # from tensorflow.keras.models import Sequential
 # from tensorflow.keras.layers import LSTM, Dense, Dropout
 # from tensorflow.keras.optimizers import Adam
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.stattools import adfuller
+from models.model_cache import ModelCache, series_fingerprint
+from models.order_selection import OrderSelector
+from models.lstm_network import LSTMNetwork
+from utils.metrics import metrics
+from utils.storage import cache_path
+import os
+import tempfile
+import threading
+import time
+from numpy.lib.stride_tricks import sliding_window_view
 import warnings
 warnings.filterwarnings('ignore')
 
+# pandas, scipy, sklearn and statsmodels are imported on first use so the app
+# starts, and answers /api/health, without paying for them
+
+
+def _parse_levels(value):
+    return tuple(float(v) for v in value.split(',') if v.strip())
+
+
 class ARIMAModel:
-    def __init__(self):
-        self.models = {}
-        self.scalers = {}
+    def __init__(self, model_cache=None, interval_levels=None, quantiles=None):
+        # Fitted results keyed by "{sku}_{store}", invalidated when the series changes
+        self.models = model_cache if model_cache is not None else ModelCache()
+        self.order_selector = OrderSelector()
+        # Interval coverages reported per forecast; 'confidence_interval' is the 95% band
+        self.interval_levels = interval_levels or _parse_levels(os.environ.get('FORECAST_INTERVAL_LEVELS', '0.8,0.95'))
+        self.quantiles = quantiles or _parse_levels(os.environ.get('FORECAST_QUANTILES', ''))
+        # Incremental updates: refit when new one-step errors exceed these many
+        # standard deviations, or after this many days appended since the last full fit
+        self.drift_threshold = float(os.environ.get('ARIMA_DRIFT_THRESHOLD', 4.0))
+        self.max_appends = int(os.environ.get('ARIMA_MAX_APPENDS', 30))
+    
+    def after_fork(self):
+        """Make the fitted state inherited by a forked pool worker safe to use there"""
+        self.models.after_fork()
+        self.order_selector.after_fork()
         
     def prepare_data(self, data, weather_data=None, holiday_data=None):
         """Prepare data for ARIMA model"""
-        # Convert to time series
-        ts_data = pd.Series(data['sales'], index=pd.to_datetime(data['date']))
+        import pandas as pd
         
-        # Add external factors if available
-        if weather_data is not None:
-            ts_data = self._add_weather_features(ts_data, weather_data)
+        # Convert to time series, reusing the store's shared index when present
+        index = data.get('date_index')
+        if index is None:
+            index = pd.to_datetime(data['date'])
+        ts_data = pd.Series(data['sales'], index=index)
         
-        if holiday_data is not None:
-            ts_data = self._add_holiday_features(ts_data, holiday_data)
-            
+        # Weather and holiday regressors arrive precomputed in data['exog']
+        # (see models.features.FeatureBuilder), aligned row for row with the sales
         return ts_data
     
-    def _add_weather_features(self, ts_data, weather_data):
-        """Add weather features to time series"""
-        # This is a simplified version - in real implementation, 
-        # you'd align weather data with sales data by date
-        return ts_data
-    
-    def _add_holiday_features(self, ts_data, holiday_data):
-        """Add holiday features to time series"""
-        # This is a simplified version - in real implementation,
-        # you'd create holiday dummy variables
-        return ts_data
+    def _meta(self, data, appends=0):
+        return {'appends': appends, 'exog_columns': data.get('exog_columns', [])}
     
     def fit(self, data, key):
-        """Fit ARIMA model to data"""
+        """Fit ARIMA model to data and cache the result under key"""
+        fingerprint = series_fingerprint(data)
+        fitted_model = self._fit_model(data, key, fingerprint)
+        if fitted_model is None:
+            return False
+        
+        self.models.put(key, fingerprint, fitted_model, meta=self._meta(data))
+        return True
+    
+    def _fit_model(self, data, key=None, fingerprint=None):
+        """Fit ARIMA model to data, returning the fitted results or None"""
         try:
             ts_data = self.prepare_data(data)
             
             # Check if we have enough data after preparation
             if len(ts_data) < 5:
-                return False
+                return None
             
-            # Check for stationarity
-            if not self._is_stationary(ts_data):
-                ts_data = ts_data.diff().dropna()
-                # Check again after differencing
-                if len(ts_data) < 3:
-                    return False
+            # The selector picks d from cached stationarity tests and lets
+            # ARIMA do the differencing, then searches (p, q) stepwise
+            with metrics.timer('arima_fit_seconds'):
+                fitted_model = self.order_selector.select(ts_data, key, fingerprint, data.get('exog'))
+            metrics.inc('arima_fits_total', result='ok')
+            return fitted_model
             
-            # Try different ARIMA parameters
-            orders_to_try = [(1, 1, 1), (1, 1, 0), (0, 1, 1), (1, 0, 1)]
+        except Exception as e:
+            metrics.inc('arima_fits_total', result='error')
+            print(f"Error fitting ARIMA model: {e}")
+            return None
+    
+    def update(self, data, key=None):
+        """Bring the cached model for the series up to date with data
+        
+        Newly arrived days are appended to the cached fitted results with the
+        parameters held fixed. A full refit only happens when there is no
+        usable cached model, the earlier history changed, the new one-step
+        errors drift past drift_threshold, or max_appends days have been
+        appended since the last full fit. Returns (fitted_model, status).
+        """
+        key = key or f"{data.get('sku_id', 'unknown')}_{data.get('store_id', 'unknown')}"
+        fingerprint = series_fingerprint(data)
+        
+        fitted_model, status = self._update(data, key, fingerprint)
+        metrics.inc('arima_updates_total', status=status)
+        return fitted_model, status
+    
+    def _update(self, data, key, fingerprint):
+        entry = self.models.get_entry(key)
+        if entry is not None and self.models.is_fresh(entry, fingerprint):
+            return entry['model'], 'unchanged'
+        
+        if entry is not None:
+            appended = self._append(entry, data)
+            if appended is not None:
+                fitted_model, appends = appended
+                self.models.put(key, fingerprint, fitted_model, meta=self._meta(data, appends))
+                return fitted_model, 'appended'
+        
+        fitted_model = self._fit_model(data, key, fingerprint)
+        if fitted_model is None:
+            return None, 'failed'
+        self.models.put(key, fingerprint, fitted_model, meta=self._meta(data))
+        return fitted_model, 'refit' if entry is not None else 'fitted'
+    
+    def _append(self, entry, data):
+        """Extend a cached fit with new observations, or None if it needs a refit"""
+        import pandas as pd
+        
+        try:
+            fitted_model = entry['model']
+            meta = entry.get('meta', {})
+            appends = meta.get('appends', 0)
+            if meta.get('exog_columns', []) != data.get('exog_columns', []):
+                return None
+            ts_data = self.prepare_data(data)
+            fitted_endog = pd.Series(np.asarray(fitted_model.model.data.orig_endog).ravel(),
+                                     index=fitted_model.model.data.row_labels)
+            last_fitted = fitted_endog.index[-1]
             
-            for p, d, q in orders_to_try:
-                try:
-                    # Fit ARIMA model
-                    model = ARIMA(ts_data, order=(p, d, q))
-                    fitted_model = model.fit()
-                    
-                    self.models[key] = fitted_model
-                    return True
-                    
-                except Exception as e:
-                    continue
+            new_data = ts_data[ts_data.index > last_fitted]
+            if len(new_data) == 0 or appends + len(new_data) > self.max_appends:
+                return None
+            if new_data.index[0] != last_fitted + pd.Timedelta(days=1):
+                return None
             
-            return False
+            # The appended state is only valid if the days it was fitted on are unchanged
+            overlap = ts_data.index.intersection(fitted_endog.index)[-7:]
+            if len(overlap) == 0 or not np.allclose(ts_data[overlap], fitted_endog[overlap], equal_nan=True):
+                return None
+            
+            new_data.index.freq = 'D'
+            exog = data.get('exog')
+            extended = fitted_model.append(new_data, exog=exog[-len(new_data):] if exog is not None else None)
+            sigma = np.sqrt(extended.params['sigma2'])
+            errors = np.abs(np.asarray(extended.resid)[-len(new_data):]) / sigma
+            if errors.max() > self.drift_threshold or errors.mean() > self.drift_threshold / 2:
+                return None
+            
+            return extended, appends + len(new_data)
             
         except Exception as e:
-            print(f"Error fitting ARIMA model: {e}")
-            return False
-    
-    def _is_stationary(self, ts_data):
-        """Check if time series is stationary"""
-        result = adfuller(ts_data.dropna())
-        return result[1] <= 0.05
+            print(f"Error appending to ARIMA model: {e}")
+            return None
     
     def predict(self, data, weather_data=None, holiday_data=None, forecast_days=30):
         """Generate ARIMA forecast"""
@@ -91,52 +171,86 @@ class ARIMAModel:
             
             # Check if we have enough data
             if len(data.get('sales', [])) < 10:
+                metrics.inc('arima_fallbacks_total', reason='short_history')
                 return self._simple_forecast(data, forecast_days)
             
-            # Fit model if not already fitted
-            if key not in self.models:
-                success = self.fit(data, key)
-                if not success:
-                    return self._simple_forecast(data, forecast_days)
+            # Reuse the cached model while the series is unchanged, otherwise
+            # extend it with the new days or refit
+            fitted_model = self.models.get(key, series_fingerprint(data))
+            if fitted_model is not None:
+                metrics.inc('arima_cache_hits_total')
+            else:
+                fitted_model, status = self.update(data, key)
+                if fitted_model is None:
+                    # Return simple moving average if model fitting fails
+                    metrics.inc('arima_fallbacks_total', reason='fit_failed')
+                    return self._simple_forecast(data, forecast_days, reason='fit_failed')
             
-            if key not in self.models:
-                # Return simple moving average if model fitting fails
-                return self._simple_forecast(data, forecast_days)
-            
-            # Generate forecast
-            forecast = self.models[key].forecast(steps=forecast_days)
-            
-            # Add confidence intervals
-            conf_int = self.models[key].get_forecast(steps=forecast_days).conf_int()
-            
-            # Ensure forecast values are non-negative
-            forecast_values = np.maximum(0, forecast.values)
-            
-            return {
-                'forecast': forecast_values.tolist(),
-                'confidence_interval': {
-                    'lower': np.maximum(0, conf_int.iloc[:, 0].values).tolist(),
-                    'upper': np.maximum(0, conf_int.iloc[:, 1].values).tolist()
-                },
-                'feature_importance': {
-                    'model_type': 'ARIMA',
-                    'parameters': str(self.models[key].params)
-                }
-            }
+            with metrics.timer('arima_forecast_seconds'):
+                return self._forecast_output(fitted_model, forecast_days, data)
             
         except Exception as e:
+            metrics.inc('arima_fallbacks_total', reason='error')
             print(f"Error in ARIMA prediction: {e}")
-            return self._simple_forecast(data, forecast_days)
+            return self._simple_forecast(data, forecast_days, reason='error')
+    
+    def _forecast_output(self, fitted_model, forecast_days, data=None):
+        """Point forecast, intervals and quantiles from a single forecast pass"""
+        from scipy.stats import norm
+        
+        data = data or {}
+        columns = data.get('exog_columns', [])
+        future_exog = None
+        if fitted_model.model.k_exog:
+            future_exog = data.get('future_exog')
+            if future_exog is None or len(future_exog) < forecast_days:
+                raise ValueError(f"Model uses {columns} but future values for {forecast_days} days are missing")
+            future_exog = future_exog[:forecast_days]
+        prediction = fitted_model.get_forecast(steps=forecast_days, exog=future_exog)
+        mean = np.asarray(prediction.predicted_mean)
+        se = np.asarray(prediction.se_mean)
+        
+        # Every interval bound and quantile is mean + z * se, so derive them all
+        # from one (bounds x steps) array and convert to lists once
+        levels = sorted(set(self.interval_levels) | {0.95})
+        probs = [0.5 - level / 2 for level in levels] + [0.5 + level / 2 for level in levels] + list(self.quantiles)
+        bounds = np.maximum(0, mean + norm.ppf(probs)[:, None] * se).tolist()
+        
+        n = len(levels)
+        intervals = {
+            f"{round(level * 100):g}": {'lower': bounds[i], 'upper': bounds[n + i]}
+            for i, level in enumerate(levels)
+        }
+        output = {
+            'forecast': np.maximum(0, mean).tolist(),
+            'confidence_interval': intervals['95'],
+            'intervals': intervals,
+            'feature_importance': {
+                'model_type': 'ARIMA',
+                'parameters': str(fitted_model.params)
+            }
+        }
+        if future_exog is not None:
+            # Regressor coefficients come right after the trend terms in the parameter vector
+            coefficients = np.asarray(fitted_model.params)[fitted_model.model.k_trend:][:len(columns)]
+            output['feature_importance']['exog_coefficients'] = dict(zip(columns, coefficients.tolist()))
+        if self.quantiles:
+            output['quantiles'] = {f"{q:g}": bounds[2 * n + i] for i, q in enumerate(self.quantiles)}
+        return output
     
-    def _simple_forecast(self, data, forecast_days):
-        """Simple moving average forecast as fallback"""
+    def _simple_forecast(self, data, forecast_days, reason=None):
+        """Simple moving average forecast as fallback
+
+        ``reason`` marks fallbacks from a failure (see forecast_engine.is_fallback);
+        a series too short to fit gets none.
+        """
         sales = data['sales']
         if len(sales) == 0:
             return {'forecast': [0] * forecast_days}
         
         # Use last 7 days average
         window = min(7, len(sales))
-        avg_sales = np.mean(sales[-window:])
+        avg_sales = float(np.mean(sales[-window:]))
         
         forecast = [max(0, avg_sales + np.random.normal(0, avg_sales * 0.1)) 
                    for _ in range(forecast_days)]
@@ -149,52 +263,297 @@ class ARIMAModel:
             },
             'feature_importance': {
                 'model_type': 'Simple Moving Average',
-                'window_size': window
+                'window_size': window,
+                **({'fallback_reason': reason} if reason else {})
             }
         }
 
 class LSTMModel:
-    def __init__(self, sequence_length=30):
+    def __init__(self, sequence_length=30, hidden_size=32, epochs=None, batch_size=64,
+                 max_train_windows=20000, seed=0, training_series=None, retrain_seconds=None,
+                 network_path=None):
         self.sequence_length = sequence_length
-        self.models = {}
-        self.scalers = {}
+        self.hidden_size = hidden_size
+        self.epochs = epochs or int(os.environ.get('LSTM_EPOCHS', 20))
+        self.batch_size = batch_size
+        self.max_train_windows = max_train_windows
+        self.seed = seed
+        # Callable returning the series to train on (the catalog); without one
+        # the network is trained on the first series it is asked to forecast
+        self.training_series = training_series
+        # Retrain in the background once the network is this old; 0 never retrains
+        self.retrain_seconds = retrain_seconds if retrain_seconds is not None else float(os.environ.get('LSTM_RETRAIN_SECONDS', 0))
+        # The catalog-trained network is saved here so restarts load it instead
+        # of training again; empty string disables saving
+        if network_path is None:
+            network_path = os.environ.get('LSTM_NETWORK_PATH', cache_path('lstm_network.joblib'))
+        self.network_path = network_path or None
+        # One global network trained across all series, each scaled to [0, 1]
+        self.network = None
+        self.train_loss = None
+        self.trained_series = 0
+        self.trained_at = None
+        self._lock = threading.Lock()
+        self._retrain_thread = None
+    
+    def after_fork(self):
+        """Make the network inherited by a forked pool worker safe to use there"""
+        self._lock = threading.Lock()
+        self._retrain_thread = None
         
     def prepare_data(self, data, weather_data=None, holiday_data=None):
         """Prepare data for LSTM model"""
-        sales_data = np.array(data['sales'])
+        from sklearn.preprocessing import MinMaxScaler
+        
+        sales_data = np.array(data['sales'], dtype=np.float64)
         
         # Normalize data
         scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_data = scaler.fit_transform(sales_data.reshape(-1, 1))
-        
-        # Create sequences
-        X, y = [], []
-        for i in range(self.sequence_length, len(scaled_data)):
-            X.append(scaled_data[i-self.sequence_length:i, 0])
-            y.append(scaled_data[i, 0])
+        scaled_data = scaler.fit_transform(sales_data.reshape(-1, 1))[:, 0]
         
-        X, y = np.array(X), np.array(y)
-        X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+        # Create sequences as strided views: row i of windows is scaled_data[i:i + L + 1]
+        windows = sliding_window_view(scaled_data, self.sequence_length + 1)
+        X = windows[:, :self.sequence_length, np.newaxis]
+        y = windows[:, self.sequence_length]
         
         return X, y, scaler
     
-    def build_model(self, input_shape):
-        """Build simplified model architecture (without TensorFlow)"""
-        # For now, return a simple model that doesn't require TensorFlow
-        return None
+    def _window_groups(self, series):
+        """Scaled (series x days) matrices and their window views, grouped by history length"""
+        by_length = {}
+        for data in series:
+            if len(data['sales']) > self.sequence_length and np.isfinite(data['sales']).any():
+                by_length.setdefault(len(data['sales']), []).append(data['sales'])
+        
+        groups = []
+        for rows in by_length.values():
+            matrix = np.array(rows, dtype=np.float64)
+            lows = np.nanmin(matrix, axis=1, keepdims=True)
+            ranges = np.nanmax(matrix, axis=1, keepdims=True) - lows
+            ranges[ranges == 0] = 1.0
+            matrix = (matrix - lows) / ranges
+            # (series, windows, L + 1) view; nothing is copied until a minibatch is gathered
+            groups.append(sliding_window_view(matrix, self.sequence_length + 1, axis=1))
+        return groups
+    
+    def iter_minibatches(self, series, batch_size=None, rng=None, max_windows=None):
+        """Yield shuffled (X, y) minibatches without materializing every window
+
+        Windows holding a missing (non-finite) value are left out, since a
+        single NaN would poison the weights of the shared network.
+        """
+        batch_size = batch_size or self.batch_size
+        groups = self._window_groups(series)
+        if not groups:
+            return
+        
+        # Flat window ids across groups: offset + series * windows_per_series + position
+        sizes = [g.shape[0] * g.shape[1] for g in groups]
+        offsets = np.cumsum([0] + sizes)
+        ids = np.arange(offsets[-1])
+        if rng is not None:
+            ids = rng.permutation(ids)
+        if max_windows is not None and len(ids) > max_windows:
+            ids = ids[:max_windows]
+        
+        L = self.sequence_length
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            group_of = np.searchsorted(offsets, batch, side='right') - 1
+            parts = []
+            for g in np.unique(group_of):
+                local = batch[group_of == g] - offsets[g]
+                per_series = groups[g].shape[1]
+                parts.append(groups[g][local // per_series, local % per_series])
+            windows = np.concatenate(parts) if len(parts) > 1 else parts[0]
+            finite = np.isfinite(windows).all(axis=1)
+            if not finite.all():
+                windows = windows[finite]
+                if not len(windows):
+                    continue
+            yield windows[:, :L], windows[:, L]
+    
+    def build_model(self, input_shape=None):
+        """Build the NumPy LSTM network"""
+        return LSTMNetwork(hidden_size=self.hidden_size, seed=self.seed)
+    
+    def fit_many(self, series, epochs=None, batch_size=None):
+        """Train the global network on windows drawn from every series"""
+        epochs = epochs or self.epochs
+        batch_size = batch_size or self.batch_size
+        
+        trainable = [data for data in series if len(data['sales']) > self.sequence_length]
+        if not trainable:
+            return False
+        
+        rng = np.random.default_rng(self.seed)
+        network = self.build_model()
+        losses = []
+        for _ in range(epochs):
+            losses = [network.train_batch(X, y)
+                      for X, y in self.iter_minibatches(trainable, batch_size, rng, self.max_train_windows)]
+        
+        # Keep serving the previous network rather than install a diverged one
+        loss = float(np.mean(losses)) if losses else float('nan')
+        if not np.isfinite(loss) or not all(np.isfinite(value).all() for value in network.params.values()):
+            print(f"LSTM training did not converge (loss {loss}); keeping the previous network")
+            return False
+        
+        self.network = network
+        self.train_loss = loss
+        self.trained_series = len(trainable)
+        self.trained_at = time.time()
+        return True
+    
+    def train(self):
+        """Train on ``training_series`` (the catalog) and save the network; False when there is none"""
+        if self.training_series is None:
+            return False
+        if not self.fit_many(self.training_series()):
+            return False
+        self.save()
+        return True
     
-    def fit(self, data, key, epochs=50, batch_size=32):
-        """Fit LSTM model to data"""
-        # For now, always return False to use simple forecast
-        return False
+    def save(self):
+        """Write the network atomically to network_path"""
+        if not self.network_path or self.network is None:
+            return False
+        tmp_path = None
+        try:
+            import joblib
+            directory = os.path.dirname(os.path.abspath(self.network_path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump({
+                    'sequence_length': self.sequence_length,
+                    'hidden_size': self.hidden_size,
+                    'network': self.network,
+                    'train_loss': self.train_loss,
+                    'trained_series': self.trained_series,
+                    'trained_at': self.trained_at
+                }, f)
+            os.replace(tmp_path, self.network_path)
+            return True
+        except Exception as e:
+            print(f"Error saving LSTM network: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+    
+    def load(self):
+        """Install the network saved by an earlier run; False when there is none that fits"""
+        if not self.network_path or not os.path.exists(self.network_path):
+            return False
+        try:
+            import joblib
+            saved = joblib.load(self.network_path)
+        except Exception as e:
+            print(f"Error loading LSTM network: {e}")
+            return False
+        if (saved['sequence_length'], saved['hidden_size']) != (self.sequence_length, self.hidden_size):
+            return False
+        self.network = saved['network']
+        self.train_loss = saved['train_loss']
+        self.trained_series = saved['trained_series']
+        # An old network is still served and retrained in the background as usual
+        self.trained_at = saved['trained_at']
+        return True
+    
+    def _retrain(self):
+        try:
+            self.train()
+        except Exception as e:
+            print(f"Error retraining LSTM model: {e}")
+    
+    def _schedule_retrain(self):
+        """Retrain in a background thread when the network is older than retrain_seconds"""
+        if (not self.retrain_seconds or self.training_series is None or self.trained_at is None
+                or time.time() - self.trained_at < self.retrain_seconds):
+            return
+        with self._lock:
+            if self._retrain_thread is None or not self._retrain_thread.is_alive():
+                self._retrain_thread = threading.Thread(target=self._retrain, name='lstm-retrain', daemon=True)
+                self._retrain_thread.start()
     
     def predict(self, data, weather_data=None, holiday_data=None, forecast_days=30):
         """Generate LSTM forecast"""
-        # For now, always use simple forecast
-        return self._simple_forecast(data, forecast_days)
+        return self.predict_many([data], forecast_days)[0]
+    
+    def predict_many(self, series, forecast_days=30):
+        """Forecast every series with one batched forward pass per step"""
+        L = self.sequence_length
+        usable = [i for i, data in enumerate(series)
+                  if len(data['sales']) > L and np.isfinite(data['sales']).all()]
+        
+        with self._lock:
+            if usable and self.network is None:
+                try:
+                    self.load() or self.train() or self.fit_many([series[i] for i in usable])
+                except Exception as e:
+                    print(f"Error training LSTM model: {e}")
+        # A background retrain may swap the network; use one for the whole batch
+        network = self.network
+        if network is None:
+            usable = []
+        else:
+            self._schedule_retrain()
+        
+        results = [None] * len(series)
+        reason = 'untrained' if network is None else None
+        for i in set(range(len(series))) - set(usable):
+            results[i] = self._simple_forecast(series[i], forecast_days, reason)
+        if not usable:
+            return results
+        
+        # Per-series min/max scaling, matching prepare_data
+        history = [series[i]['sales'] for i in usable]
+        lows = np.array([np.min(h) for h in history], dtype=np.float64)
+        ranges = np.array([np.max(h) for h in history], dtype=np.float64) - lows
+        ranges[ranges == 0] = 1.0
+        
+        # Only the tails are needed: n_resid one-step windows for the residual
+        # spread plus the final window that seeds the recursive forecast
+        n_resid = min(28, min(len(h) for h in history) - L)
+        tails = np.array([h[len(h) - L - n_resid:] for h in history], dtype=np.float64)
+        tails = (tails - lows[:, None]) / ranges[:, None]
+        windows = sliding_window_view(tails, L, axis=1)  # (series, n_resid + 1, L)
+        
+        one_step = network.forward(windows[:, :-1].reshape(-1, L)).reshape(len(usable), n_resid)
+        sigma = np.sqrt(((one_step - tails[:, L:]) ** 2).mean(axis=1)) * ranges
+        
+        # Recursive multi-step forecast for all series at once
+        window = windows[:, -1]
+        steps = np.empty((len(usable), forecast_days))
+        for step in range(forecast_days):
+            steps[:, step] = network.forward(window)
+            window = np.concatenate([window[:, 1:], steps[:, step:step + 1]], axis=1)
+        
+        point = np.maximum(0, steps * ranges[:, None] + lows[:, None])
+        spread = 1.959963984540054 * sigma[:, None] * np.sqrt(np.arange(1, forecast_days + 1))
+        lower = np.maximum(0, point - spread).tolist()
+        upper = (point + spread).tolist()
+        point = point.tolist()
+        
+        for row, i in enumerate(usable):
+            results[i] = {
+                'forecast': point[row],
+                'confidence_interval': {
+                    'lower': lower[row],
+                    'upper': upper[row]
+                },
+                'feature_importance': {
+                    'model_type': 'LSTM',
+                    'sequence_length': L,
+                    'hidden_size': self.hidden_size,
+                    'trained_series': self.trained_series,
+                    'train_loss': self.train_loss
+                }
+            }
+        return results
     
-    def _simple_forecast(self, data, forecast_days):
-        """Simple forecast as fallback"""
+    def _simple_forecast(self, data, forecast_days, reason=None):
+        """Simple forecast as fallback; ``reason`` marks fallbacks from a failure"""
         sales = data['sales']
         if len(sales) == 0:
             return {'forecast': [0] * forecast_days}
@@ -202,7 +561,7 @@ class LSTMModel:
         # Use exponential smoothing
         alpha = 0.3
         forecast = []
-        last_value = sales[-1] if sales else 0
+        last_value = float(sales[-1]) if len(sales) else 0
         
         for _ in range(forecast_days):
             next_value = max(0, last_value + np.random.normal(0, last_value * 0.1))
@@ -217,6 +576,7 @@ class LSTMModel:
             },
             'feature_importance': {
                 'model_type': 'Exponential Smoothing',
-                'alpha': alpha
+                'alpha': alpha,
+                **({'fallback_reason': reason} if reason else {})
             }
         } 
\ No newline at end of file
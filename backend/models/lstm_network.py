@@ -0,0 +1,106 @@
+import numpy as np
+
+
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+class LSTMNetwork:
+    """Single-layer LSTM with a linear head, written in vectorized NumPy
+
+    Inputs are (batch, time) windows of a univariate series and the output is
+    the next value. Gate weights for input, forget, cell and output gates are
+    packed into one (1 + hidden, 4 * hidden) matrix so every time step is a
+    single matrix multiply for the whole minibatch. Trained with Adam on MSE
+    using backpropagation through time.
+    """
+
+    def __init__(self, hidden_size=32, learning_rate=0.005, seed=0):
+        self.hidden_size = hidden_size
+        self.learning_rate = learning_rate
+        rng = np.random.default_rng(seed)
+        scale = 1.0 / np.sqrt(hidden_size)
+        H = hidden_size
+        self.params = {
+            'W': rng.uniform(-scale, scale, (1 + H, 4 * H)),
+            'b': np.zeros(4 * H),
+            'Wy': rng.uniform(-scale, scale, H),
+            'by': np.zeros(1)
+        }
+        # A positive forget-gate bias helps gradients flow early in training
+        self.params['b'][H:2 * H] = 1.0
+        self._m = {name: np.zeros_like(value) for name, value in self.params.items()}
+        self._v = {name: np.zeros_like(value) for name, value in self.params.items()}
+        self._step = 0
+
+    def forward(self, X, keep_cache=False):
+        """Predict the next value for each (batch, time) window"""
+        H = self.hidden_size
+        W, b = self.params['W'], self.params['b']
+        batch, steps = X.shape
+        h = np.zeros((batch, H))
+        c = np.zeros((batch, H))
+        inputs = np.empty((batch, 1 + H))
+        cache = []
+
+        for t in range(steps):
+            inputs[:, 0] = X[:, t]
+            inputs[:, 1:] = h
+            z = inputs @ W + b
+            i = _sigmoid(z[:, :H])
+            f = _sigmoid(z[:, H:2 * H])
+            g = np.tanh(z[:, 2 * H:3 * H])
+            o = _sigmoid(z[:, 3 * H:])
+            c_prev = c
+            c = f * c + i * g
+            tanh_c = np.tanh(c)
+            h = o * tanh_c
+            if keep_cache:
+                cache.append((inputs.copy(), c_prev, i, f, g, o, tanh_c))
+
+        y = h @ self.params['Wy'] + self.params['by'][0]
+        return (y, (cache, h)) if keep_cache else y
+
+    def backward(self, cache, dy):
+        """Gradients of the loss given dLoss/dy for every window"""
+        H = self.hidden_size
+        W = self.params['W']
+        steps, h_last = cache
+        grads = {name: np.zeros_like(value) for name, value in self.params.items()}
+        grads['Wy'] = h_last.T @ dy
+        grads['by'][0] = dy.sum()
+
+        dh = np.outer(dy, self.params['Wy'])
+        dc = np.zeros_like(dh)
+        dz = np.empty((len(dy), 4 * H))
+        for inputs, c_prev, i, f, g, o, tanh_c in reversed(steps):
+            dc = dc + dh * o * (1 - tanh_c ** 2)
+            dz[:, :H] = dc * g * i * (1 - i)
+            dz[:, H:2 * H] = dc * c_prev * f * (1 - f)
+            dz[:, 2 * H:3 * H] = dc * i * (1 - g ** 2)
+            dz[:, 3 * H:] = dh * tanh_c * o * (1 - o)
+            grads['W'] += inputs.T @ dz
+            grads['b'] += dz.sum(axis=0)
+            dh = dz @ W[1:].T
+            dc = dc * f
+        return grads
+
+    def train_batch(self, X, y, clip_norm=1.0):
+        """One Adam step on a minibatch; returns the batch MSE"""
+        pred, cache = self.forward(X, keep_cache=True)
+        error = pred - y
+        grads = self.backward(cache, 2 * error / len(y))
+
+        norm = np.sqrt(sum((grad ** 2).sum() for grad in grads.values()))
+        if norm > clip_norm:
+            for grad in grads.values():
+                grad *= clip_norm / norm
+
+        self._step += 1
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        lr = self.learning_rate * np.sqrt(1 - beta2 ** self._step) / (1 - beta1 ** self._step)
+        for name, grad in grads.items():
+            self._m[name] = beta1 * self._m[name] + (1 - beta1) * grad
+            self._v[name] = beta2 * self._v[name] + (1 - beta2) * grad ** 2
+            self.params[name] -= lr * self._m[name] / (np.sqrt(self._v[name]) + eps)
+        return float((error ** 2).mean())
@@ -0,0 +1,218 @@
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.storage import cache_path
+
+DEFAULT_CACHE_DIR = cache_path('models')
+
+
+def series_fingerprint(data):
+    """Stable hash of a series' sales values, date span and exogenous regressors"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(data.get('sales', []), dtype=np.float64).tobytes())
+    exog = data.get('exog')
+    if exog is not None:
+        digest.update(np.ascontiguousarray(exog, dtype=np.float64).tobytes())
+    dates = data.get('date', [])
+    if len(dates):
+        digest.update(str(dates[0]).encode())
+        digest.update(str(dates[-1]).encode())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """Bounded LRU cache of fitted models with an optional on-disk tier
+
+    Entries are keyed by series key and only returned while the fingerprint of
+    the series they were fitted on still matches and they are younger than
+    ``max_age`` seconds. The disk tier (one joblib file per key) lets fitted
+    models survive restarts and be shared between worker processes.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, cache_dir=None, max_age=None):
+        self.max_entries = max_entries or int(os.environ.get('MODEL_CACHE_MAX_ENTRIES', 1000))
+        self.max_bytes = max_bytes or int(float(os.environ.get('MODEL_CACHE_MAX_MB', 256)) * 1024 * 1024)
+        self.max_age = max_age or float(os.environ.get('MODEL_CACHE_MAX_AGE_HOURS', 24)) * 3600
+        if cache_dir is None:
+            cache_dir = os.environ.get('MODEL_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.cache_dir = cache_dir or None  # empty string disables the disk tier
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def after_fork(self):
+        """Replace the lock in a forked child, where another thread may have held it"""
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, re.sub(r'[^A-Za-z0-9_.-]', '_', key) + '.joblib')
+
+    def is_fresh(self, entry, fingerprint):
+        return entry['fingerprint'] == fingerprint and time.time() - entry['fitted_at'] <= self.max_age
+
+    def get(self, key, fingerprint):
+        """Return the fitted model for key, or None if missing or stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.is_fresh(entry, fingerprint):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry['model']
+                # Stale entries stay until replaced so ARIMAModel.update can
+                # extend them; another worker may have a fresher one on disk
+
+        entry = self._load(key)
+        if entry is not None and self.is_fresh(entry, fingerprint):
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._insert(key, entry)
+                self.disk_hits += 1
+            return entry['model']
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get_entry(self, key):
+        """Return the cached entry for key even if stale, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+        return self._load(key)
+
+    def put(self, key, fingerprint, model, meta=None):
+        """Store a fitted model in memory and, if enabled, on disk"""
+        entry = {
+            'fingerprint': fingerprint,
+            'fitted_at': time.time(),
+            'model': model,
+            'meta': meta or {}
+        }
+        size = self._dump(key, entry)
+        if size is None:
+            size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        entry['size'] = size
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._insert(key, entry)
+
+    def preload(self, limit=None):
+        """Load the most recently written disk entries into memory, returning how many
+
+        Used before forking server workers so every worker starts with the
+        fitted models in shared (copy-on-write) memory instead of loading or
+        refitting them on its own. Keys are taken from the file names.
+        """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        names = [name for name in os.listdir(self.cache_dir) if name.endswith('.joblib')]
+        names.sort(key=lambda name: os.path.getmtime(os.path.join(self.cache_dir, name)), reverse=True)
+        loaded = 0
+        for name in names[:min(limit or self.max_entries, self.max_entries)]:
+            key = name[:-len('.joblib')]
+            entry = self._load(key)
+            if entry is None or time.time() - entry['fitted_at'] > self.max_age:
+                continue
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._insert(key, entry)
+            loaded += 1
+        return loaded
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _insert(self, key, entry):
+        entry.setdefault('size', 0)
+        self._entries[key] = entry
+        self._bytes += entry['size']
+        # Evict least recently used entries, but always keep the newest one
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.get('size', 0)
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            import joblib
+            entry = joblib.load(path)
+            entry['size'] = os.path.getsize(path)
+            return entry
+        except Exception as e:
+            print(f"Error loading cached model {key}: {e}")
+            return None
+
+    def _dump(self, key, entry):
+        """Write entry atomically so concurrent workers never read a partial file"""
+        if not self.cache_dir:
+            return None
+        tmp_path = None
+        try:
+            import joblib
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+            return os.path.getsize(self._path(key))
+        except Exception as e:
+            print(f"Error writing cached model {key}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
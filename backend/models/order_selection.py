@@ -0,0 +1,174 @@
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+_statsmodels = None
+
+
+def _statsmodels_api():
+    """(ARIMA, adfuller, kpss), imported on the first fit
+
+    statsmodels takes a while to import, so the app starts without it. Its
+    import switches its own warnings back on, so they are silenced again here.
+    """
+    global _statsmodels
+    if _statsmodels is None:
+        from statsmodels.tsa.arima.model import ARIMA
+        from statsmodels.tsa.stattools import adfuller, kpss
+        warnings.filterwarnings('ignore')
+        _statsmodels = (ARIMA, adfuller, kpss)
+    return _statsmodels
+
+
+class OrderSelector:
+    """Stepwise information-criterion search for ARIMA orders
+
+    The differencing order comes from ADF and KPSS tests whose outcome is
+    cached per series fingerprint. (p, q) are searched stepwise from (1, d, 1),
+    moving to the first neighbour that improves the criterion by at least
+    ``min_improvement`` and stopping when none does or after ``max_fits``
+    candidate fits. A key that was already searched just refits its previous
+    order warm-started from the previous parameters, with a full search
+    every ``search_interval`` refits. Exogenous regressors, when given, are
+    included in every candidate fit.
+    """
+
+    def __init__(self, max_p=3, max_q=3, criterion='aic', max_fits=5,
+                 min_improvement=2.0, search_interval=10, cache_size=10000):
+        self.max_p = max_p
+        self.max_q = max_q
+        self.criterion = criterion
+        self.max_fits = max_fits
+        self.min_improvement = min_improvement
+        self.search_interval = search_interval
+        self.cache_size = cache_size
+
+        self._differencing = OrderedDict()  # fingerprint -> d
+        self._previous = {}  # key -> (order, params, refits since last search, exog columns)
+        self._lock = threading.Lock()
+
+        self.selections = 0
+        self.fits = 0
+        self.failed_fits = 0
+        self.fit_seconds = 0.0
+        self.stationarity_hits = 0
+        self.stationarity_misses = 0
+
+    def after_fork(self):
+        """Replace the lock in a forked child, where another thread may have held it"""
+        self._lock = threading.Lock()
+
+    def differencing_order(self, ts_data, fingerprint=None):
+        """Return d (0 or 1) for the series, reusing cached test results"""
+        if fingerprint is not None:
+            with self._lock:
+                if fingerprint in self._differencing:
+                    self._differencing.move_to_end(fingerprint)
+                    self.stationarity_hits += 1
+                    return self._differencing[fingerprint]
+
+        d = 0 if self._is_stationary(ts_data) else 1
+
+        with self._lock:
+            self.stationarity_misses += 1
+            if fingerprint is not None:
+                self._differencing[fingerprint] = d
+                while len(self._differencing) > self.cache_size:
+                    self._differencing.popitem(last=False)
+        return d
+
+    def _is_stationary(self, ts_data):
+        """ADF rejects a unit root and KPSS does not reject level stationarity"""
+        _, adfuller, kpss = _statsmodels_api()
+        values = ts_data.dropna()
+        adf_pvalue = adfuller(values, autolag='AIC')[1]
+        if adf_pvalue > 0.05:
+            return False
+        kpss_pvalue = kpss(values, regression='c', nlags='auto')[1]
+        return kpss_pvalue > 0.05
+
+    def select(self, ts_data, key=None, fingerprint=None, exog=None):
+        """Fit the best ARIMA model found by the stepwise search, or None"""
+        d = self.differencing_order(ts_data, fingerprint)
+        k_exog = 0 if exog is None else exog.shape[1]
+
+        previous_order, previous_params, refits, previous_k_exog = self._previous.get(key, (None, None, 0, 0))
+        if (previous_order is not None and previous_order[1] == d and previous_k_exog == k_exog
+                and refits < self.search_interval):
+            result = self._fit(ts_data, previous_order, previous_params, exog)
+            if result is not None:
+                self._record(key, previous_order, result, refits + 1, k_exog)
+                return result
+
+        fitted = {}
+        best_order, best = None, None
+        for order in [(1, d, 1), (1, d, 0), (0, d, 1), (0, d, 0)]:
+            fitted[order] = self._fit(ts_data, order, exog=exog)
+            if fitted[order] is not None:
+                best_order, best = order, fitted[order]
+                break
+        if best is None:
+            return None
+
+        improved = True
+        while improved and len(fitted) < self.max_fits:
+            improved = False
+            for order in self._neighbours(best_order):
+                if order in fitted:
+                    continue
+                if len(fitted) >= self.max_fits:
+                    break
+                result = self._fit(ts_data, order, exog=exog)
+                fitted[order] = result
+                if result is not None and self._score(result) < self._score(best) - self.min_improvement:
+                    # Take the first improving step instead of scoring every neighbour
+                    best_order, best = order, result
+                    improved = True
+                    break
+
+        self._record(key, best_order, best, 0, k_exog)
+        return best
+
+    def _record(self, key, order, result, refits, k_exog):
+        with self._lock:
+            self.selections += 1
+            if key is not None:
+                self._previous[key] = (order, result.params, refits, k_exog)
+
+    def _neighbours(self, order):
+        p, d, q = order
+        steps = [(p + 1, q), (p, q + 1), (p - 1, q), (p, q - 1)]
+        return [(np_, d, nq) for np_, nq in steps
+                if 0 <= np_ <= self.max_p and 0 <= nq <= self.max_q]
+
+    def _score(self, result):
+        return getattr(result, self.criterion)
+
+    def _fit(self, ts_data, order, start_params=None, exog=None):
+        ARIMA = _statsmodels_api()[0]
+        started = time.perf_counter()
+        try:
+            result = ARIMA(ts_data, exog=exog, order=order).fit(start_params=start_params)
+        except Exception:
+            result = None
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.fits += 1
+            self.fit_seconds += elapsed
+            if result is None:
+                self.failed_fits += 1
+        return result
+
+    def stats(self):
+        return {
+            'selections': self.selections,
+            'fits': self.fits,
+            'failed_fits': self.failed_fits,
+            'fit_seconds': round(self.fit_seconds, 4),
+            'fits_per_second': round(self.fits / self.fit_seconds, 2) if self.fit_seconds else 0.0,
+            'fits_per_selection': round(self.fits / self.selections, 2) if self.selections else 0.0,
+            'stationarity_cache_hits': self.stationarity_hits,
+            'stationarity_cache_misses': self.stationarity_misses
+        }
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from utils.external_apis import HolidayAPI
+from utils.history_file import HistoryFile
+
+WEEKEND_MULTIPLIER = 1.3
+DAILY_TREND = 0.001
+NOISE_STD = 0.15
+
+
+def weekday(dates):
+    """Monday=0 weekday for datetime64[D] values (1970-01-01 was a Thursday)"""
+    return (np.asarray(dates, dtype='datetime64[D]').astype(np.int64) + 3) % 7
+
+
+class SyntheticSalesGenerator:
+    """Vectorized generator of realistic daily sales for many SKU/store series
+
+    Demand is base demand x weekend effect x linear trend x holiday impact
+    (from ``HolidayAPI.holidays``) x Gaussian noise. Every series draws its
+    noise from its own NumPy Generator seeded with (seed, key), so a series
+    is identical no matter which other series it is generated with.
+    """
+
+    def __init__(self, seed=None, holidays=None):
+        self.seed = seed if seed is not None else int(os.environ.get('SYNTHETIC_DATA_SEED', 42))
+        self.holidays = holidays if holidays is not None else HolidayAPI().holidays
+
+    def _rng(self, sku_id, store_id, stream=0):
+        return np.random.default_rng([self.seed, zlib.crc32(f"{sku_id}_{store_id}".encode()), stream])
+
+    def holiday_multipliers(self, sku_ids, dates):
+        """(len(sku_ids) x days) holiday impact, 1.0 outside holidays"""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        unique_skus, sku_rows = np.unique(np.asarray(sku_ids, dtype=object).astype(str), return_inverse=True)
+        multipliers = np.ones((len(unique_skus), len(dates)), dtype=np.float32)
+        for date_str, holiday in self.holidays.items():
+            columns = np.nonzero(dates == np.datetime64(date_str, 'D'))[0]
+            if len(columns):
+                impact = holiday.get('impact', {})
+                multipliers[:, columns[0]] = [impact.get(sku, 1.0) for sku in unique_skus]
+        return multipliers[sku_rows]
+
+    def base_demands(self, keys):
+        """Deterministic per-series base demand for catalog-scale fixtures"""
+        return np.array([self._rng(sku_id, store_id, stream=1).lognormal(np.log(50), 0.6) for sku_id, store_id in keys])
+
+    def generate(self, keys, dates, base_demands):
+        """(len(keys) x days) float32 sales matrix for (sku_id, store_id) keys"""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        n_days = len(dates)
+
+        # Shape (days,) profile shared by every series
+        profile = np.where(weekday(dates) >= 5, WEEKEND_MULTIPLIER, 1.0)
+        profile *= 1 + np.arange(n_days) * DAILY_TREND
+
+        sales = np.empty((len(keys), n_days), dtype=np.float32)
+        for row, (sku_id, store_id) in enumerate(keys):
+            sales[row] = self._rng(sku_id, store_id).normal(1, NOISE_STD, n_days)
+        sales *= np.asarray(base_demands, dtype=np.float32)[:, None] * profile.astype(np.float32)
+        sales *= self.holiday_multipliers([sku_id for sku_id, _ in keys], dates)
+        np.maximum(sales, 0, out=sales)
+        return np.round(sales, out=sales)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic sales history for load testing')
+    parser.add_argument('path', help='History directory to create')
+    parser.add_argument('--skus', type=int, default=1000)
+    parser.add_argument('--stores', type=int, default=100)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generator = SyntheticSalesGenerator(seed=args.seed)
+    keys = [(f"SKU{sku:06d}", f"STORE{store:04d}")
+            for sku in range(1, args.skus + 1) for store in range(1, args.stores + 1)]
+    end_date = np.datetime64('today', 'D')
+    dates = np.arange(end_date - args.days + 1, end_date + 1)
+    sales = generator.generate(keys, dates, generator.base_demands(keys))
+    history = HistoryFile.create(args.path, dates[0], keys, sales)
+    print(json.dumps({
+        'series': history.n_series,
+        'days': int(history.n_days),
+        'rows': int(sales.size),
+        'seconds': round(time.perf_counter() - started, 2)
+    }))
+
+
+if __name__ == '__main__':
+    main()
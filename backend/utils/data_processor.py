@@ -1,7 +1,13 @@
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import random
+import os
+import threading
+from utils.data_generator import SyntheticSalesGenerator
+from utils.history_file import HistoryFile
+from utils.sales_store import SalesStore
+from utils.simulation import ScenarioEngine
+from utils.inventory import InventoryOptimizer
 
 class DataProcessor:
     def __init__(self):
@@ -18,31 +24,80 @@ class DataProcessor:
             'STORE002': {'name': 'Suburban Store', 'location': 'Los Angeles', 'size': 'medium'},
             'STORE003': {'name': 'Mall Store', 'location': 'Chicago', 'size': 'small'}
         }
+        
+        self.history_days = 90
+        self.generator = SyntheticSalesGenerator()
+        self.sales_store = None
+        self._store_lock = threading.Lock()
+        self.scenario_engine = ScenarioEngine()
+        self.inventory_optimizer = InventoryOptimizer()
+        
+        # Real sales history, memory-mapped and shared between workers; when
+        # unset, synthetic history is generated per series on first use
+        history_path = os.environ.get('SALES_HISTORY_PATH')
+        self.history_file = HistoryFile(history_path) if history_path else None
     
     def get_historical_data(self, sku_ids, store_ids):
         """Get historical sales data for SKUs and stores"""
+        store = self.get_sales_store(sku_ids, store_ids)
         data = {}
         
         for sku_id in sku_ids:
             for store_id in store_ids:
                 key = f"{sku_id}_{store_id}"
                 
-                # Generate realistic historical data
-                base_demand = self._get_base_demand(sku_id, store_id)
-                dates = self._generate_dates(90)  # 90 days of historical data
-                sales = self._generate_sales_data(base_demand, dates, sku_id, store_id)
-                
-                data[key] = {
-                    'sku_id': sku_id,
-                    'store_id': store_id,
-                    'date': dates,
-                    'sales': sales,
-                    'sku_info': self.sku_info.get(sku_id, {}),
-                    'store_info': self.store_info.get(store_id, {})
-                }
+                # Sales are views into the columnar store and dates are shared
+                series = store.series(sku_id, store_id)
+                if series is None:
+                    continue
+                series['sku_info'] = self.sku_info.get(sku_id, {})
+                series['store_info'] = self.store_info.get(store_id, {})
+                data[key] = series
         
         return data
     
+    def get_all_keys(self):
+        """Every (sku_id, store_id) series known to the processor"""
+        if self.history_file is not None:
+            return list(self.history_file.keys)
+        return [(sku_id, store_id) for sku_id in self.sku_info for store_id in self.store_info]
+    
+    def get_catalog_series(self, limit):
+        """History of up to ``limit`` catalog series, e.g. for training the global LSTM"""
+        keys = self.get_all_keys()[:limit]
+        wanted = {f"{sku_id}_{store_id}" for sku_id, store_id in keys}
+        sku_ids = sorted({sku_id for sku_id, _ in keys})
+        store_ids = sorted({store_id for _, store_id in keys})
+        historical_data = self.get_historical_data(sku_ids, store_ids)
+        return [data for key, data in historical_data.items() if key in wanted]
+    
+    def get_sales_store(self, sku_ids, store_ids):
+        """Columnar sales store holding at least the given SKU/store series"""
+        if self.history_file is not None:
+            with self._store_lock:
+                # Rebuild the zero-copy view only when a new day was appended
+                if self.history_file.refresh() or self.sales_store is None:
+                    self.sales_store = self.history_file.sales_store(self.history_days)
+                return self.sales_store
+        
+        with self._store_lock:
+            today = np.datetime64(datetime.now().date(), 'D')
+            if self.sales_store is None or self.sales_store.dates[-1] != today:
+                dates = np.arange(today - self.history_days, today + 1)
+                self.sales_store = SalesStore(dates)
+            store = self.sales_store
+            
+            missing = [(sku_id, store_id) for sku_id in sku_ids for store_id in store_ids
+                       if (sku_id, store_id) not in store]
+            if missing:
+                # Generate realistic historical data once per series, in one vectorized call
+                base_demands = [self._get_base_demand(sku_id, store_id) for sku_id, store_id in missing]
+                sales = self.generator.generate(missing, store.dates, base_demands)
+                for row, (sku_id, store_id) in enumerate(missing):
+                    store.add_series(sku_id, store_id, sales[row])
+        
+        return store
+    
     def _get_base_demand(self, sku_id, store_id):
         """Get base demand for SKU-store combination"""
         base_demands = {
@@ -57,140 +112,22 @@ class DataProcessor:
     
     def _generate_dates(self, days):
         """Generate list of dates"""
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        dates = []
-        current_date = start_date
-        while current_date <= end_date:
-            dates.append(current_date.strftime('%Y-%m-%d'))
-            current_date += timedelta(days=1)
-        
-        return dates
+        end_date = np.datetime64(datetime.now().date(), 'D')
+        return np.arange(end_date - days, end_date + 1).astype(str).tolist()
     
     def _generate_sales_data(self, base_demand, dates, sku_id, store_id):
         """Generate realistic sales data with trends and seasonality"""
-        sales = []
-        
-        for i, date in enumerate(dates):
-            # Base demand
-            demand = base_demand
-            
-            # Add weekly seasonality (weekend effect)
-            date_obj = datetime.strptime(date, '%Y-%m-%d')
-            if date_obj.weekday() >= 5:  # Weekend
-                demand *= 1.3
-            
-            # Add monthly trend (slight growth)
-            trend_factor = 1 + (i * 0.001)
-            demand *= trend_factor
-            
-            # Add random variation
-            variation = random.normalvariate(1, 0.15)
-            demand *= variation
-            
-            # Ensure non-negative values
-            demand = max(0, demand)
-            
-            sales.append(round(demand))
-        
-        return sales
+        sales = self.generator.generate([(sku_id, store_id)], dates, [base_demand])[0]
+        return sales.astype(int).tolist()
     
     def apply_scenario(self, base_forecast, scenario):
         """Apply scenario changes to forecast"""
-        modified_forecast = base_forecast.copy()
-        
-        if not modified_forecast or 'forecasts' not in modified_forecast:
-            return modified_forecast
-        
-        for key, forecast in modified_forecast['forecasts'].items():
-            if 'forecast' not in forecast:
-                continue
-                
-            # Apply scenario multipliers
-            weather_multiplier = scenario.get('weather_impact', 1.0)
-            promotion_multiplier = scenario.get('promotion_impact', 1.0)
-            holiday_multiplier = scenario.get('holiday_impact', 1.0)
-            price_change = scenario.get('price_change', 0)
-            competitor_action = scenario.get('competitor_action', 'none')
-            
-            # Calculate price impact (inverse relationship)
-            price_multiplier = 1 / (1 + (price_change / 100))
-            
-            # Calculate competitor impact
-            competitor_impacts = {
-                'none': 1.0,
-                'price_cut': 0.8,
-                'promotion': 0.9,
-                'new_product': 0.7,
-                'aggressive': 0.6
-            }
-            competitor_multiplier = competitor_impacts.get(competitor_action, 1.0)
-            
-            # Apply total impact
-            total_multiplier = (weather_multiplier * promotion_multiplier * 
-                              holiday_multiplier * price_multiplier * competitor_multiplier)
-            
-            # Apply to forecast values
-            forecast['forecast'] = [max(0, val * total_multiplier) for val in forecast['forecast']]
-            
-            # Update confidence intervals if they exist
-            if 'confidence_interval' in forecast:
-                if 'lower' in forecast['confidence_interval']:
-                    forecast['confidence_interval']['lower'] = [
-                        max(0, val * total_multiplier) for val in forecast['confidence_interval']['lower']
-                    ]
-                if 'upper' in forecast['confidence_interval']:
-                    forecast['confidence_interval']['upper'] = [
-                        max(0, val * total_multiplier) for val in forecast['confidence_interval']['upper']
-                    ]
-        
-        return modified_forecast
+        # Returns a modified copy; base_forecast is left untouched
+        return self.scenario_engine.apply(base_forecast, [scenario])[0]
     
-    def generate_inventory_suggestions(self, forecasts, current_inventory):
+    def generate_inventory_suggestions(self, forecasts, current_inventory, service_level=None):
         """Generate inventory suggestions based on forecasts"""
-        suggestions = {}
-        
-        if not forecasts or 'forecasts' not in forecasts:
-            return suggestions
-        
-        for key, forecast in forecasts['forecasts'].items():
-            if 'forecast' not in forecast:
-                continue
-                
-            # Calculate total forecasted demand
-            total_demand = sum(forecast['forecast'])
-            
-            # Get current inventory
-            current_stock = current_inventory.get(key, 0)
-            
-            # Calculate suggested inventory
-            safety_stock = total_demand * 0.2  # 20% safety stock
-            suggested_inventory = total_demand + safety_stock
-            
-            # Determine action needed
-            if current_stock < suggested_inventory * 0.8:
-                action = 'restock'
-                urgency = 'high' if current_stock < suggested_inventory * 0.5 else 'medium'
-            elif current_stock > suggested_inventory * 1.2:
-                action = 'reduce'
-                urgency = 'high' if current_stock > suggested_inventory * 1.5 else 'medium'
-            else:
-                action = 'maintain'
-                urgency = 'low'
-            
-            suggestions[key] = {
-                'sku_id': forecast.get('sku_id', ''),
-                'store_id': forecast.get('store_id', ''),
-                'current_inventory': current_stock,
-                'forecasted_demand': round(total_demand),
-                'suggested_inventory': round(suggested_inventory),
-                'action': action,
-                'urgency': urgency,
-                'order_quantity': max(0, round(suggested_inventory - current_stock)) if action == 'restock' else 0
-            }
-        
-        return suggestions
+        return self.inventory_optimizer.optimize(forecasts, current_inventory, service_level)
     
     def get_store_performance(self, store_ids, days=30):
         """Get historical performance metrics for stores"""
@@ -1,18 +1,66 @@
-import requests
 import json
+from bisect import bisect_left
 from datetime import datetime, timedelta
+import os
 import random
+import zlib
+import numpy as np
+from utils.ttl_cache import TTLCache
+
+SAMPLE_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_data.json')
+
+def load_store_coordinates(path=SAMPLE_DATA_PATH):
+    """(latitude, longitude) per store from the sample catalog"""
+    try:
+        with open(path) as f:
+            stores = json.load(f).get('stores', [])
+        return {store['store_id']: (store['latitude'], store['longitude']) for store in stores}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load store coordinates: {e}")
+        return {}
+
+def _day_uniforms(store_id, days, streams):
+    """(streams x days) uniforms in [0, 1) that depend only on the store and day number"""
+    # splitmix64 over (store hash, day, stream), vectorized with wrapping uint64 arithmetic
+    with np.errstate(over='ignore'):
+        x = (np.uint64(zlib.crc32(store_id.encode())) << np.uint64(32)) ^ np.asarray(days, dtype=np.uint64)
+        x = x[None, :] * np.uint64(streams) + np.arange(streams, dtype=np.uint64)[:, None]
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
 
 class WeatherAPI:
-    def __init__(self):
-        self.api_key = "demo_key"  # Replace with actual API key
-        self.base_url = "https://api.openweathermap.org/data/2.5"
+    def __init__(self, cache=None, client=None):
+        # Live OpenWeatherMap data is used when an API key is configured,
+        # otherwise (and for stores the upstream fails on) weather is simulated
+        self.api_key = os.environ.get('OPENWEATHER_API_KEY')
+        self.base_url = os.environ.get('OPENWEATHER_BASE_URL', "https://api.openweathermap.org/data/2.5")
+        if client is None and self.api_key:
+            # Imported here so requests is only loaded when live weather is used
+            from utils.weather_client import WeatherClient
+            client = WeatherClient(self.api_key, self.base_url)
+        self.client = client
+        self.store_coordinates = load_store_coordinates()
+        # Forecast days keyed by (store_id, date), shared across requests
+        self.cache = cache if cache is not None else TTLCache(name='weather')
+    
+    def _coordinates(self, store_ids):
+        return {store_id: self.store_coordinates[store_id] for store_id in store_ids
+                if store_id in self.store_coordinates}
         
     def get_current_weather(self, store_ids):
         """Get current weather for stores"""
         weather_data = {}
+        fetched = {}
+        if self.client is not None:
+            fetched = self.client.current_many(self._coordinates(store_ids))
         
         for store_id in store_ids:
+            if fetched.get(store_id) is not None:
+                weather_data[store_id] = fetched[store_id]
+                continue
             # Simulate weather data for demo
             conditions = ['clear', 'rain', 'cloudy']
             weather_data[store_id] = {
@@ -26,23 +74,88 @@ class WeatherAPI:
         
         return weather_data
     
-    def get_weather_forecast(self, store_ids, days):
-        """Get weather forecast for stores"""
-        forecast_data = {}
+    def get_weather_forecast(self, store_ids, days, start_date=None):
+        """Get weather forecast for stores, for ``days`` days from start_date (default today)"""
+        start_date = start_date or datetime.now()
+        dates = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        cached = {store_id: [self.cache.get((store_id, date_str)) for date_str in dates] for store_id in store_ids}
+        
+        def dates_in_state(wanted):
+            by_store = {store_id: [date_str for date_str, (_, state) in zip(dates, entries) if state == wanted]
+                        for store_id, entries in cached.items()}
+            return {store_id: store_dates for store_id, store_dates in by_store.items() if store_dates}
+        
+        # Only days with nothing usable cached are fetched while the request waits,
+        # for all stores at once
+        missing = dates_in_state(None)
+        loaded = self._load_forecasts(missing) if missing else {}
+        
+        stale = dates_in_state('stale')
+        if stale:
+            # Serve the stale days now and refresh them behind the request
+            self.cache.refresh_async(tuple(sorted(stale)), lambda: self._load_forecasts(stale))
+        
+        return {
+            store_id: [loaded[store_id][date_str] if state is None else day
+                       for date_str, (day, state) in zip(dates, entries)]
+            for store_id, entries in cached.items()
+        }
+    
+    def get_weather_history(self, store_ids, dates):
+        """Observed daily weather for past dates
+        
+        Historical weather is simulated for demo, deterministically per store
+        and day, so a series' regressors do not change between requests.
+        """
+        days = np.asarray(dates, dtype='datetime64[D]')
+        date_strs = days.astype(str).tolist()
+        conditions = np.array(['clear', 'rain', 'cloudy'])
+        history = {}
         
         for store_id in store_ids:
-            forecast_data[store_id] = []
-            for i in range(days):
-                conditions = ['clear', 'rain', 'cloudy']
-                forecast_data[store_id].append({
-                    'date': (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d'),
-                    'temperature': random.randint(15, 35),
-                    'humidity': random.randint(30, 80),
-                    'wind_speed': random.randint(5, 25),
-                    'weather_condition': random.choice(conditions)
-                })
-        
-        return forecast_data
+            rng = _day_uniforms(store_id, days.astype(np.int64), 4)
+            temperature = 15 + (rng[0] * 21).astype(int)
+            humidity = 30 + (rng[1] * 51).astype(int)
+            wind_speed = 5 + (rng[2] * 21).astype(int)
+            condition = conditions[(rng[3] * 3).astype(int)]
+            history[store_id] = [{
+                'date': date_strs[i],
+                'temperature': int(temperature[i]),
+                'humidity': int(humidity[i]),
+                'wind_speed': int(wind_speed[i]),
+                'weather_condition': str(condition[i])
+            } for i in range(len(days))]
+        
+        return history
+    
+    def _load_forecasts(self, dates_by_store):
+        """Fetch forecasts for {store_id: dates} as {store_id: {date: day}}, caching each day"""
+        fetched = {}
+        if self.client is not None:
+            fetched = self.client.forecast_many(self._coordinates(dates_by_store))
+        
+        forecasts = {}
+        for store_id, dates in dates_by_store.items():
+            days = fetched.get(store_id)
+            # Days past the upstream's horizon are simulated
+            forecasts[store_id] = {date_str: (days or {}).get(date_str) or self._simulate_day(date_str)
+                                   for date_str in dates}
+            # A store the upstream failed on is not cached, so it is retried next request
+            if days is not None or self.client is None:
+                for date_str, day in forecasts[store_id].items():
+                    self.cache.put((store_id, date_str), day)
+        return forecasts
+    
+    def _simulate_day(self, date_str):
+        """Simulated forecast day for demo"""
+        conditions = ['clear', 'rain', 'cloudy']
+        return {
+            'date': date_str,
+            'temperature': random.randint(15, 35),
+            'humidity': random.randint(30, 80),
+            'wind_speed': random.randint(5, 25),
+            'weather_condition': random.choice(conditions)
+        }
 
 class HolidayAPI:
     def __init__(self):
@@ -114,18 +227,31 @@ class HolidayAPI:
                 }
             }
         }
+        self.build_index()
+    
+    def build_index(self):
+        """Sort holiday dates once so range queries are two bisects (call after editing holidays)"""
+        # ISO date strings sort chronologically
+        self.holiday_dates = sorted(self.holidays)
+    
+    def _holidays_between(self, start_date, days):
+        """(days_until, date_str) for holidays in [start_date, start_date + days)"""
+        start_str = start_date.strftime('%Y-%m-%d')
+        end_str = (start_date + timedelta(days=days)).strftime('%Y-%m-%d')
+        first = bisect_left(self.holiday_dates, start_str)
+        last = bisect_left(self.holiday_dates, end_str)
+        start_day = datetime.strptime(start_str, '%Y-%m-%d')
+        return [((datetime.strptime(date_str, '%Y-%m-%d') - start_day).days, date_str)
+                for date_str in self.holiday_dates[first:last]]
     
     def get_holidays(self, days):
         """Get holidays for the next N days"""
         holidays = []
-        start_date = datetime.now()
         
-        for i in range(days):
-            date_str = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-            if date_str in self.holidays:
-                holiday = self.holidays[date_str].copy()
-                holiday['date'] = date_str
-                holidays.append(holiday)
+        for _, date_str in self._holidays_between(datetime.now(), days):
+            holiday = self.holidays[date_str].copy()
+            holiday['date'] = date_str
+            holidays.append(holiday)
         
         return holidays
     
@@ -141,14 +267,11 @@ class HolidayAPI:
     def get_upcoming_holidays(self, days=30):
         """Get upcoming holidays with their impact data"""
         upcoming = []
-        start_date = datetime.now()
-        
-        for i in range(days):
-            date_str = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-            if date_str in self.holidays:
-                holiday = self.holidays[date_str].copy()
-                holiday['date'] = date_str
-                holiday['days_until'] = i
-                upcoming.append(holiday)
+        
+        for days_until, date_str in self._holidays_between(datetime.now(), days):
+            holiday = self.holidays[date_str].copy()
+            holiday['date'] = date_str
+            holiday['days_until'] = days_until
+            upcoming.append(holiday)
         
         return upcoming 
\ No newline at end of file
@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_STORE_PATH = cache_path('forecasts.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    sku_id TEXT NOT NULL,
+    store_id TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    forecast_days INTEGER NOT NULL,
+    as_of TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (sku_id, store_id, model_type, forecast_days, as_of)
+)
+"""
+
+
+def as_of_date(data):
+    """Last day of history in a series dict, as YYYY-MM-DD"""
+    import pandas as pd
+    return str(pd.Timestamp(data['date'][-1]).date())
+
+
+class ForecastStore(SQLiteStore):
+    """Precomputed forecasts in SQLite, keyed by SKU, store, model, horizon and as-of date
+
+    The as-of date is the last day of history a forecast was computed from,
+    so a stored forecast is served until a new day of sales arrives. WAL
+    mode lets the batch job write while the API reads.
+    """
+
+    schema = (SCHEMA,)
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.environ.get('FORECAST_STORE_PATH', DEFAULT_STORE_PATH)
+        super().__init__(path)
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys, model_type, forecast_days):
+        """Stored entries for (sku_id, store_id, as_of) keys, as {(sku_id, store_id): entry}"""
+        found = {}
+        conn = self._connection()
+        for sku_id, store_id, as_of in keys:
+            row = conn.execute(
+                'SELECT entry FROM forecasts WHERE sku_id = ? AND store_id = ? AND model_type = ? '
+                'AND forecast_days = ? AND as_of = ?',
+                (sku_id, store_id, model_type, int(forecast_days), as_of)
+            ).fetchone()
+            if row is not None:
+                found[(sku_id, store_id)] = json.loads(row[0])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, rows, model_type, forecast_days):
+        """Store (sku_id, store_id, as_of, entry) rows in one transaction"""
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(sku_id, store_id, model_type, int(forecast_days), as_of, now, json.dumps(entry))
+                 for sku_id, store_id, as_of, entry in rows]
+            )
+
+    def prune(self, keep_as_of):
+        """Delete forecasts computed from history older than keep_as_of"""
+        with self._connection() as conn:
+            return conn.execute('DELETE FROM forecasts WHERE as_of < ?', (keep_as_of,)).rowcount
+
+    def stats(self):
+        count = self._connection().execute('SELECT COUNT(*) FROM forecasts').fetchone()[0]
+        return {'rows': count, 'hits': self.hits, 'misses': self.misses, 'path': self.path}
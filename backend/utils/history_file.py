@@ -0,0 +1,144 @@
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+from utils.sales_store import SalesStore
+
+META_FILE = 'meta.json'
+SALES_FILE = 'sales.f32'
+
+
+class HistoryFile:
+    """Memory-mapped daily sales history on disk
+
+    A history directory holds ``meta.json`` (start date and the ordered
+    SKU/store keys) and ``sales.f32``, a raw float32 matrix stored day-major:
+    one row of ``n_series`` values per day. Appending a day is a single
+    write at the end of the file, and the day count is derived from the file
+    size, so readers never see a partially written day and no metadata has to
+    be rewritten. Readers map the file read-only, so every worker process
+    shares the same page-cache pages instead of holding its own copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.start_date = np.datetime64(meta['start_date'], 'D')
+        self.keys = [tuple(key) for key in meta['keys']]
+        self.n_series = len(self.keys)
+        self._sales_path = os.path.join(path, SALES_FILE)
+        self._row_bytes = self.n_series * np.dtype(np.float32).itemsize
+        self._mapped_days = None
+        self._matrix = None
+        self.refresh()
+
+    @classmethod
+    def create(cls, path, start_date, keys, sales=None):
+        """Write a new history from a (series x days) matrix, or empty"""
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            'version': 1,
+            'start_date': str(np.datetime64(start_date, 'D')),
+            'keys': [list(key) for key in keys]
+        }
+        with open(os.path.join(path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+        with open(os.path.join(path, SALES_FILE), 'wb') as f:
+            if sales is not None:
+                # Transpose once so each day is contiguous on disk
+                np.ascontiguousarray(np.asarray(sales, dtype=np.float32).T).tofile(f)
+        return cls(path)
+
+    @property
+    def n_days(self):
+        return os.path.getsize(self._sales_path) // self._row_bytes if self._row_bytes else 0
+
+    @property
+    def end_date(self):
+        return self.start_date + self.n_days - 1
+
+    def refresh(self):
+        """Remap the file if days were appended since it was last mapped"""
+        n_days = self.n_days
+        if n_days == self._mapped_days:
+            return False
+        if n_days:
+            self._matrix = np.memmap(self._sales_path, dtype=np.float32, mode='r',
+                                     shape=(n_days, self.n_series))
+        else:
+            self._matrix = np.empty((0, self.n_series), dtype=np.float32)
+        self._mapped_days = n_days
+        return True
+
+    def append_day(self, values, date=None):
+        """Append one day of sales (NaN for unknown series), padding skipped days"""
+        values = np.asarray(values, dtype=np.float32)
+        if values.shape != (self.n_series,):
+            raise ValueError(f"Expected {self.n_series} values, got {values.shape}")
+
+        next_date = self.start_date + self.n_days
+        date = next_date if date is None else np.datetime64(date, 'D')
+        if date < next_date:
+            raise ValueError(f"History already covers {date}; next appendable day is {next_date}")
+
+        gap = int((date - next_date).astype(int))
+        with open(self._sales_path, 'ab') as f:
+            if gap:
+                np.full((gap, self.n_series), np.nan, dtype=np.float32).tofile(f)
+            values.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh()
+
+    def sales_store(self, last_days=None):
+        """Zero-copy SalesStore over the most recent days of the mapped file"""
+        self.refresh()
+        n_days = self._mapped_days
+        start = 0 if last_days is None else max(0, n_days - last_days - 1)
+        dates = self.start_date + np.arange(start, n_days)
+        # Rows of the day-major block are contiguous; the transpose is a view
+        return SalesStore(dates, sales=self._matrix[start:].T, keys=self.keys)
+
+
+def _append_from_csv(history, csv_path, date):
+    """Append one day from a CSV with sku_id, store_id and sales columns"""
+    rows = {key: row for row, key in enumerate(history.keys)}
+    values = np.full(history.n_series, np.nan, dtype=np.float32)
+    with open(csv_path, newline='') as f:
+        for record in csv.DictReader(f):
+            row = rows.get((record['sku_id'], record['store_id']))
+            if row is not None:
+                values[row] = float(record['sales'])
+    history.append_day(values, date)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or append to a memory-mapped sales history')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    info = subparsers.add_parser('info', help='Show history size and date range')
+    info.add_argument('path')
+
+    append = subparsers.add_parser('append', help='Append one day of sales from a CSV file')
+    append.add_argument('path')
+    append.add_argument('csv', help='CSV with sku_id, store_id and sales columns')
+    append.add_argument('--date', help='Day being appended (default: the next day)')
+
+    args = parser.parse_args()
+    history = HistoryFile(args.path)
+    if args.command == 'append':
+        _append_from_csv(history, args.csv, args.date)
+    print(json.dumps({
+        'series': history.n_series,
+        'days': int(history.n_days),
+        'start_date': str(history.start_date),
+        'end_date': str(history.end_date)
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import json
+import os
+
+import numpy as np
+
+from utils.external_apis import SAMPLE_DATA_PATH
+
+# Width of the forecasts' confidence_interval in standard deviations (a 95% band),
+# norm.ppf(0.975); scipy.stats is only imported once suggestions are requested
+CI_Z = 1.959963984540054
+# Relative demand uncertainty assumed when a forecast has no interval
+DEFAULT_CV = 0.2
+# Stock above this multiple of the order-up-to level is reported as excess
+OVERSTOCK_RATIO = 1.5
+
+
+class ServiceLevelError(ValueError):
+    """A service level that is not a number strictly between 0 and 1"""
+
+
+def check_service_level(service_level):
+    """The service level as a float, or ServiceLevelError when it is not in (0, 1)"""
+    if isinstance(service_level, bool) or not isinstance(service_level, (int, float)):
+        raise ServiceLevelError(f"service_level must be a number between 0 and 1, got {service_level!r}")
+    if not 0 < service_level < 1:
+        raise ServiceLevelError(f"service_level must be strictly between 0 and 1, got {service_level}")
+    return float(service_level)
+
+
+def load_sku_policies(path=SAMPLE_DATA_PATH):
+    """Supplier lead time and minimum order quantity per SKU from the sample catalog"""
+    try:
+        with open(path) as f:
+            skus = json.load(f).get('skus', [])
+        return {sku['sku_id']: {'lead_time_days': sku.get('lead_time_days'),
+                                'min_order_quantity': sku.get('min_order_quantity')} for sku in skus}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load SKU policies: {e}")
+        return {}
+
+
+class InventoryOptimizer:
+    """Periodic-review replenishment for many SKU/store pairs in one array pass
+
+    Forecasts become a (series x days) demand matrix with a matching daily
+    standard deviation derived from each forecast's confidence interval.
+    Each series is protected over its supplier lead time plus the review
+    period: the order-up-to level is the expected demand over that window
+    plus ``z(service_level)`` times its standard deviation, the reorder point
+    is the same over the lead time alone, and orders are rounded up to the
+    SKU's minimum order quantity.
+    """
+
+    def __init__(self, service_level=None, review_period_days=None, sku_policies=None):
+        if service_level is None:
+            service_level = float(os.environ.get('INVENTORY_SERVICE_LEVEL', 0.95))
+        self.service_level = check_service_level(service_level)
+        self.review_period_days = review_period_days or int(os.environ.get('INVENTORY_REVIEW_DAYS', 7))
+        self.default_lead_time = int(os.environ.get('INVENTORY_DEFAULT_LEAD_TIME_DAYS', 3))
+        self.sku_policies = sku_policies if sku_policies is not None else load_sku_policies()
+
+    def _matrices(self, forecasts):
+        """(demand, daily sigma) matrices, NaN-padded to the longest horizon"""
+        lengths = [len(forecast['forecast']) for forecast in forecasts]
+        horizon = max(lengths)
+        if min(lengths) == horizon:
+            # Equal horizons (the normal case) convert in one call per matrix
+            demand = np.maximum(0, np.array([forecast['forecast'] for forecast in forecasts], dtype=float))
+        else:
+            demand = np.full((len(forecasts), horizon), np.nan)
+            for row, forecast in enumerate(forecasts):
+                demand[row, :lengths[row]] = np.maximum(0, forecast['forecast'])
+
+        sigma = demand * DEFAULT_CV
+        rows = [row for row, forecast in enumerate(forecasts)
+                if len(forecast.get('confidence_interval', {}).get('lower', [])) == horizon == lengths[row]
+                and len(forecast['confidence_interval'].get('upper', [])) == horizon]
+        if rows:
+            lower = np.array([forecasts[row]['confidence_interval']['lower'] for row in rows], dtype=float)
+            upper = np.array([forecasts[row]['confidence_interval']['upper'] for row in rows], dtype=float)
+            sigma[rows] = np.maximum(0, upper - lower) / (2 * CI_Z)
+        return demand, sigma
+
+    def _window(self, demand, sigma, days):
+        """Expected demand and its standard deviation over each series' first ``days`` days
+
+        Days beyond the forecast horizon repeat the series' mean daily demand
+        and variance; daily errors are treated as independent.
+        """
+        steps = np.arange(demand.shape[1])[None, :]
+        inside = steps < days[:, None]
+        covered = (inside & ~np.isnan(demand)).sum(axis=1)
+        extra = np.maximum(0, days - covered)
+
+        mean_demand = np.nanmean(demand, axis=1)
+        mean_variance = np.nanmean(sigma ** 2, axis=1)
+        total = np.where(inside, np.nan_to_num(demand), 0).sum(axis=1) + extra * mean_demand
+        variance = np.where(inside, np.nan_to_num(sigma) ** 2, 0).sum(axis=1) + extra * mean_variance
+        return total, np.sqrt(variance)
+
+    def optimize(self, forecasts, current_inventory, service_level=None):
+        """Replenishment suggestion per series of a forecast response"""
+        service_level = self.service_level if service_level is None else check_service_level(service_level)
+        if not forecasts or 'forecasts' not in forecasts:
+            return {}
+        items = [(key, forecast) for key, forecast in forecasts['forecasts'].items()
+                 if forecast.get('forecast')]
+        if not items:
+            return {}
+
+        keys = [key for key, _ in items]
+        sku_ids = [forecast.get('sku_id') or key.split('_')[0] for key, forecast in items]
+        store_ids = [forecast.get('store_id') or key.split('_', 1)[-1] for key, forecast in items]
+        policies = [self.sku_policies.get(sku_id, {}) for sku_id in sku_ids]
+        lead_time = np.array([policy.get('lead_time_days') or self.default_lead_time for policy in policies])
+        moq = np.array([policy.get('min_order_quantity') or 1 for policy in policies], dtype=float)
+        stock = np.array([float(current_inventory.get(key, 0) or 0) for key in keys])
+
+        from scipy.stats import norm
+        
+        demand, sigma = self._matrices([forecast for _, forecast in items])
+        z = norm.ppf(service_level)
+
+        lead_demand, lead_sigma = self._window(demand, sigma, lead_time)
+        cover_demand, cover_sigma = self._window(demand, sigma, lead_time + self.review_period_days)
+        safety_stock = z * cover_sigma
+        reorder_point = lead_demand + z * lead_sigma
+        order_up_to = cover_demand + safety_stock
+
+        # Orders bring stock back up to the order-up-to level, at least one MOQ
+        needs_order = stock <= reorder_point
+        order_quantity = np.where(needs_order, np.maximum(np.ceil(order_up_to - stock), moq), 0)
+
+        # Days of forecast demand the current stock covers
+        cumulative = np.nancumsum(demand, axis=1)
+        covered_days = (cumulative <= stock[:, None]).sum(axis=1)
+        horizon_days = (~np.isnan(demand)).sum(axis=1)
+        mean_demand = np.nanmean(demand, axis=1)
+        beyond = np.divide(stock, mean_demand, out=np.full_like(stock, np.inf), where=mean_demand > 0)
+        days_until_stockout = np.where(covered_days >= horizon_days, np.maximum(horizon_days, np.floor(beyond)), covered_days)
+
+        overstocked = stock > order_up_to * OVERSTOCK_RATIO
+        action = np.where(needs_order, 'restock', np.where(overstocked, 'reduce', 'maintain'))
+        urgency = np.where(
+            needs_order,
+            np.where(days_until_stockout < lead_time, 'high', 'medium'),
+            np.where(overstocked, np.where(stock > order_up_to * 2, 'high', 'medium'), 'low')
+        )
+
+        total_demand = np.nansum(demand, axis=1)
+        columns = {
+            'forecasted_demand': np.round(total_demand).astype(int).tolist(),
+            'suggested_inventory': np.round(order_up_to).astype(int).tolist(),
+            'order_quantity': order_quantity.astype(int).tolist(),
+            'lead_time_days': lead_time.astype(int).tolist(),
+            'lead_time_demand': np.round(lead_demand, 1).tolist(),
+            'safety_stock': np.round(safety_stock).astype(int).tolist(),
+            'reorder_point': np.round(reorder_point).astype(int).tolist(),
+            'min_order_quantity': moq.astype(int).tolist(),
+            'days_until_stockout': [int(days) if np.isfinite(days) else None for days in days_until_stockout],
+            'action': action.tolist(),
+            'urgency': urgency.tolist()
+        }
+
+        suggestions = {}
+        for row, key in enumerate(keys):
+            suggestion = {
+                'sku_id': sku_ids[row],
+                'store_id': store_ids[row],
+                'current_inventory': current_inventory.get(key, 0),
+                'service_level': service_level
+            }
+            for name, values in columns.items():
+                suggestion[name] = values[row]
+            suggestion['suggested_reorder'] = suggestion['order_quantity']
+            suggestions[key] = suggestion
+        return suggestions
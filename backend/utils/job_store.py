@@ -0,0 +1,155 @@
+import json
+import os
+import time
+
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_JOB_STORE_PATH = cache_path('forecast_jobs.sqlite')
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    total INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    fallbacks INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    owner_pid INTEGER,
+    heartbeat_at REAL
+)
+"""
+
+# Columns added after the first release, for stores created before them
+ADDED_COLUMNS = {'owner_pid': 'INTEGER', 'heartbeat_at': 'REAL'}
+
+COLUMNS = ('job_id', 'status', 'params', 'created_at', 'started_at', 'finished_at',
+           'total', 'completed', 'fallbacks', 'error', 'cancel_requested')
+
+
+class JobStore(SQLiteStore):
+    """Forecast job status, progress and results in SQLite
+
+    Shared by every server process, so a job submitted to one gunicorn worker
+    can be polled, cancelled and collected through any other. The worker
+    running a job writes its progress and reads the cancel flag here, and
+    WAL mode lets readers poll while the job writes. The owning process
+    (``owner_pid``) refreshes ``heartbeat_at`` while the job is queued or
+    running, so a job whose process died can be told apart from a slow one
+    and marked failed.
+    """
+
+    schema = (SCHEMA,)
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.environ.get('FORECAST_JOB_STORE_PATH', DEFAULT_JOB_STORE_PATH)
+        super().__init__(path)
+        with self._connection() as conn:
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(forecast_jobs)')}
+            for name, kind in ADDED_COLUMNS.items():
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE forecast_jobs ADD COLUMN {name} {kind}")
+
+    def create(self, job):
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT INTO forecast_jobs (job_id, status, params, created_at, owner_pid, heartbeat_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (job.id, job.status, json.dumps(job.params), job.created_at, os.getpid(), job.created_at)
+            )
+
+    def get(self, job_id, include_result=False):
+        """The job's columns as a dict (plus 'result' when asked), or None"""
+        columns = COLUMNS + ('result',) if include_result else COLUMNS
+        row = self._connection().execute(
+            f"SELECT {', '.join(columns)} FROM forecast_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job['params'] = json.loads(job['params'])
+        if job.get('result') is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def start(self, job):
+        """Mark a queued job running; False when it was cancelled in the meantime"""
+        with self._connection() as conn:
+            return conn.execute(
+                "UPDATE forecast_jobs SET status = 'running', started_at = ? "
+                "WHERE job_id = ? AND status = 'queued' AND cancel_requested = 0",
+                (job.started_at, job.id)
+            ).rowcount == 1
+
+    def progress(self, job):
+        """Record progress; returns True when a cancel was requested"""
+        with self._connection() as conn:
+            conn.execute(
+                'UPDATE forecast_jobs SET total = ?, completed = ?, fallbacks = ?, heartbeat_at = ? WHERE job_id = ?',
+                (job.total, job.completed, job.fallbacks, time.time(), job.id)
+            )
+            row = conn.execute('SELECT cancel_requested FROM forecast_jobs WHERE job_id = ?', (job.id,)).fetchone()
+        return bool(row and row[0])
+
+    def heartbeat(self, job_ids):
+        """Mark the given unfinished jobs as still owned by a live process"""
+        if not job_ids:
+            return
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE forecast_jobs SET heartbeat_at = ? WHERE job_id = ? AND status IN ('queued', 'running')",
+                [(time.time(), job_id) for job_id in job_ids]
+            )
+
+    def fail_stale(self, stale_seconds):
+        """Fail unfinished jobs whose process stopped sending heartbeats; returns how many"""
+        now = time.time()
+        with self._connection() as conn:
+            return conn.execute(
+                "UPDATE forecast_jobs SET status = 'failed', finished_at = ?, "
+                "error = 'Worker process ' || COALESCE(owner_pid, '?') || ' stopped while running the job' "
+                "WHERE status IN ('queued', 'running') AND COALESCE(heartbeat_at, created_at) < ?",
+                (now, now - stale_seconds)
+            ).rowcount
+
+    def finish(self, job):
+        with self._connection() as conn:
+            conn.execute(
+                'UPDATE forecast_jobs SET status = ?, finished_at = ?, total = ?, completed = ?, fallbacks = ?, '
+                'error = ?, result = ? WHERE job_id = ?',
+                (job.status, job.finished_at, job.total, job.completed, job.fallbacks, job.error,
+                 json.dumps(job.result) if job.result is not None else None, job.id)
+            )
+
+    def request_cancel(self, job_id):
+        """Flag a job for cancellation, finishing it at once if still queued; False if unknown"""
+        with self._connection() as conn:
+            found = conn.execute(
+                'UPDATE forecast_jobs SET cancel_requested = 1 WHERE job_id = ?', (job_id,)
+            ).rowcount == 1
+            conn.execute(
+                "UPDATE forecast_jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+        return found
+
+    def prune(self, retention_seconds, max_retained):
+        """Drop expired finished jobs, then the oldest finished ones over the limit"""
+        states = ', '.join(f"'{state}'" for state in FINISHED_STATES)
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM forecast_jobs WHERE status IN ({states}) AND finished_at < ?",
+                         (time.time() - retention_seconds,))
+            excess = conn.execute('SELECT COUNT(*) FROM forecast_jobs').fetchone()[0] - max_retained
+            if excess > 0:
+                conn.execute(
+                    f"DELETE FROM forecast_jobs WHERE job_id IN (SELECT job_id FROM forecast_jobs "
+                    f"WHERE status IN ({states}) ORDER BY finished_at LIMIT ?)", (excess,)
+                )
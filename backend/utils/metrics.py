@@ -0,0 +1,258 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.storage import cache_path
+
+DEFAULT_PROFILE_DIR = cache_path('profiles')
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+DESCRIPTIONS = {
+    'http_request_duration_seconds': 'Request latency by endpoint and status',
+    'forecast_stage_seconds': 'Time spent per forecast request stage',
+    'forecast_series_seconds': 'Time to forecast one series',
+    'forecast_series_total': 'Series forecast, by model and outcome',
+    'forecast_vectorized_seconds': 'Time for one vectorized forecast pass',
+    'forecast_missing_series_total': 'Requested series without history',
+    'forecast_store_lookups_total': 'Precomputed forecast lookups, by result',
+    'arima_fit_seconds': 'Time to select and fit one ARIMA model',
+    'arima_fits_total': 'ARIMA fits, by result',
+    'arima_updates_total': 'ARIMA model updates, by status',
+    'arima_cache_hits_total': 'ARIMA predictions served from a cached fit',
+    'arima_fallbacks_total': 'ARIMA predictions that fell back to a moving average, by reason',
+    'arima_forecast_seconds': 'Time to produce forecast output from a fitted ARIMA model',
+    'forecast_result_cache_entries': 'Forecast results held for forecast_id lookups',
+    'arima_model_cache_entries': 'Fitted ARIMA models held in memory'
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and latency histograms
+
+    Series are keyed by metric name and label set. Worker processes keep
+    their own registry; ``drain`` hands back what they recorded since the
+    last call so the parent can ``merge`` it. ``render`` produces the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[index] += 1
+                    break
+            values[-2] += seconds
+            values[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the with-block in the name histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def after_fork(self):
+        """Start a forked child with a fresh lock and none of the parent's measurements"""
+        self._lock = threading.Lock()
+        self.drain()
+
+    def drain(self):
+        """Counters and histograms recorded since the last drain, then reset"""
+        with self._lock:
+            snapshot = {'counters': self._counters, 'histograms': self._histograms}
+            self._counters = {}
+            self._histograms = {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add a drained snapshot (e.g. from a worker process) into this registry"""
+        if not snapshot:
+            return
+        with self._lock:
+            for key, value in snapshot.get('counters', {}).items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in snapshot.get('histograms', {}).items():
+                current = self._histograms.get(key)
+                if current is None:
+                    self._histograms[key] = list(values)
+                else:
+                    self._histograms[key] = [a + b for a, b in zip(current, values)]
+
+    def render(self):
+        """All metrics in the Prometheus text format, labelled with this process's pid
+
+        Every server worker keeps its own registry, so the pid keeps their
+        series apart when they are scraped through the same port.
+        """
+        process = (('pid', str(os.getpid())),)
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        lines = []
+        for kind, series in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name == name:
+                        lines.append(f"{name}{_format_labels(process + tuple(labels))} {value:g}")
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (series_name, labels), values in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                labels = process + tuple(labels)
+                cumulative = 0
+                for bound, count in zip(self.buckets, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfiler:
+    """Opt-in cProfile of single requests
+
+    A request is profiled when it carries the ``X-Profile`` header; its
+    value is a sampling probability (``1`` profiles every such request).
+    Reports are the top functions by cumulative time and are kept for the
+    last ``max_reports`` profiled requests, as files under ``path`` so any
+    server process can return a report another one wrote; an empty
+    ``REQUEST_PROFILE_DIR`` keeps them in process memory. Set
+    ``REQUEST_PROFILING=0`` to ignore the header. Only the request thread is
+    profiled, not work done in the forecast worker processes.
+    """
+
+    def __init__(self, enabled=None, max_reports=None, top=None, path=None):
+        self.enabled = enabled if enabled is not None else os.environ.get('REQUEST_PROFILING', '1') != '0'
+        self.max_reports = max_reports or int(os.environ.get('REQUEST_PROFILE_REPORTS', 20))
+        self.top = top or int(os.environ.get('REQUEST_PROFILE_TOP', 40))
+        if path is None:
+            path = os.environ.get('REQUEST_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+        self.path = path or None
+        self.reports = {}
+        # cProfile hooks are process-wide in recent Pythons, so profile one request at a time
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def start(self, header_value):
+        """A running profiler if this request should be profiled, else None"""
+        if not self.enabled or not header_value:
+            return None
+        try:
+            rate = float(header_value)
+        except ValueError:
+            rate = 1.0 if header_value.lower() in ('true', 'yes', 'on') else 0.0
+        if rate <= 0 or random.random() >= rate or not self._active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger or coverage tool) already owns the hook
+            self._active.release()
+            return None
+        return profiler
+
+    def finish(self, profiler, profile_id, label):
+        """Stop the profiler and keep its report under profile_id"""
+        profiler.disable()
+        self._active.release()
+        stream = io.StringIO()
+        stream.write(f"{label}\n\n")
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(self.top)
+        if self.path:
+            self._save(profile_id, stream.getvalue())
+            return
+        with self._lock:
+            self.reports[profile_id] = stream.getvalue()
+            while len(self.reports) > self.max_reports:
+                self.reports.pop(next(iter(self.reports)))
+
+    def _save(self, profile_id, report):
+        """Write the report atomically, then drop the oldest files over max_reports"""
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = os.path.join(self.path, f".{profile_id}.tmp")
+            with open(tmp_path, 'w') as f:
+                f.write(report)
+            os.replace(tmp_path, os.path.join(self.path, f"{profile_id}.txt"))
+        except OSError as e:
+            print(f"Could not save profile {profile_id}: {e}")
+            return
+        reports = []
+        for name in os.listdir(self.path):
+            try:
+                if name.endswith('.txt'):
+                    reports.append((os.path.getmtime(os.path.join(self.path, name)), name))
+            except OSError:
+                pass  # pruned by another worker meanwhile
+        for _, name in sorted(reports)[:-self.max_reports]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def report(self, profile_id):
+        if self.path:
+            # Profile IDs are hex UUIDs; anything else cannot name a report file
+            if not profile_id.isalnum():
+                return None
+            try:
+                with open(os.path.join(self.path, f"{profile_id}.txt")) as f:
+                    return f.read()
+            except OSError:
+                return None
+        with self._lock:
+            return self.reports.get(profile_id)
+
+
+# Process-wide registry used across the app and the forecast workers
+metrics = MetricsRegistry()
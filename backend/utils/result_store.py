@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_RESULT_STORE_PATH = cache_path('forecast_results.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_results (
+    forecast_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    result TEXT NOT NULL
+)
+"""
+
+INDEX = 'CREATE INDEX IF NOT EXISTS forecast_results_created_at ON forecast_results (created_at)'
+
+
+class ResultStore(SQLiteStore):
+    """Forecast results referenced by forecast_id, in SQLite shared by every worker
+
+    Has the same get/put interface as the TTLCache it replaces, so a
+    forecast_id handed out by one gunicorn worker resolves in any other.
+    Results expire ``ttl`` seconds after they were stored and only the
+    ``max_entries`` newest are kept.
+    """
+
+    schema = (SCHEMA, INDEX)
+
+    def __init__(self, path=None, max_entries=None, ttl=None):
+        if path is None:
+            path = os.environ.get('FORECAST_RESULT_STORE_PATH', DEFAULT_RESULT_STORE_PATH)
+        super().__init__(path)
+        self.max_entries = max_entries or int(os.environ.get('FORECAST_RESULT_CACHE_SIZE', 200))
+        self.ttl = ttl if ttl is not None else float(os.environ.get('FORECAST_RESULT_TTL_SECONDS', 3600))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM forecast_results WHERE created_at >= ?', (time.time() - self.ttl,)
+        ).fetchone()[0]
+
+    def get(self, key):
+        """(result, 'fresh'), or (None, None) when unknown or expired"""
+        row = self._connection().execute(
+            'SELECT result FROM forecast_results WHERE forecast_id = ? AND created_at >= ?',
+            (key, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        return json.loads(row[0]), 'fresh'
+
+    def put(self, key, value):
+        """Store a result, dropping expired ones and the oldest over max_entries"""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO forecast_results VALUES (?, ?, ?)', (key, now, json.dumps(value)))
+            conn.execute('DELETE FROM forecast_results WHERE created_at < ?', (now - self.ttl,))
+            conn.execute(
+                'DELETE FROM forecast_results WHERE forecast_id IN (SELECT forecast_id FROM forecast_results '
+                'ORDER BY created_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            )
+
+    def stats(self):
+        return {'entries': len(self), 'max_entries': self.max_entries, 'hits': self.hits,
+                'misses': self.misses, 'path': self.path}
@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+
+
+def fill_missing(sales):
+    """(sales, first observed day) with missing (non-finite) days filled in
+
+    Days before a series' first observation are dropped, since the series
+    did not exist yet; later gaps repeat the last observed value. Returns
+    (None, None) when the series has no observation at all.
+    """
+    observed = np.isfinite(sales)
+    if not observed.any():
+        return None, None
+    first = int(np.argmax(observed))
+    observed = observed[first:]
+    last_seen = np.where(observed, np.arange(len(observed)), 0)
+    np.maximum.accumulate(last_seen, out=last_seen)
+    return np.asarray(sales[first:])[last_seen], first
+
+
+class SalesStore:
+    """Columnar sales history for many SKU/store series
+
+    Sales live in one contiguous float32 (series x days) matrix over a single
+    shared datetime64 date index. SKUs and stores are dictionary-encoded to
+    integer codes, and each series is addressed by its row in the matrix.
+
+    Passing ``sales`` and ``keys`` wraps an existing matrix (for example a
+    memory-mapped history file) without copying it; such a store is read-only.
+    Missing days are stored as NaN and filled in by ``series`` (see
+    ``fill_missing``), so consumers only ever see finite sales.
+    """
+
+    def __init__(self, dates, capacity=64, sales=None, keys=None):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self._date_index = None
+        self.sku_codes = {}
+        self.store_codes = {}
+        self.sku_ids = []
+        self.store_ids = []
+        self._rows = {}  # (sku_code, store_code) -> row
+        self._lock = threading.Lock()
+
+        if sales is None:
+            self.readonly = False
+            self._sales = np.zeros((capacity, len(self.dates)), dtype=np.float32)
+            self._series_sku = np.zeros(capacity, dtype=np.int32)
+            self._series_store = np.zeros(capacity, dtype=np.int32)
+            self.n_series = 0
+        else:
+            self.readonly = True
+            # np.asarray drops the memmap subclass so rows pickle as plain arrays
+            self._sales = np.asarray(sales)
+            self.n_series = len(keys)
+            self._series_sku = np.empty(self.n_series, dtype=np.int32)
+            self._series_store = np.empty(self.n_series, dtype=np.int32)
+            for row, (sku_id, store_id) in enumerate(keys):
+                sku_code = self._code(self.sku_codes, self.sku_ids, sku_id)
+                store_code = self._code(self.store_codes, self.store_ids, store_id)
+                self._series_sku[row] = sku_code
+                self._series_store[row] = store_code
+                self._rows[(sku_code, store_code)] = row
+
+    @property
+    def sales(self):
+        """(series x days) view over the populated rows"""
+        return self._sales[:self.n_series]
+
+    @property
+    def date_index(self):
+        """Shared pandas DatetimeIndex, built once from the datetime64 dates"""
+        if self._date_index is None:
+            import pandas as pd
+            self._date_index = pd.DatetimeIndex(self.dates, freq='D')
+        return self._date_index
+
+    @property
+    def nbytes(self):
+        return self.sales.nbytes + self.dates.nbytes + self._series_sku[:self.n_series].nbytes * 2
+
+    def _code(self, codes, ids, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(ids)
+            ids.append(value)
+        return code
+
+    def row(self, sku_id, store_id):
+        """Row of the series in the sales matrix, or None if it is not stored"""
+        sku_code = self.sku_codes.get(sku_id)
+        store_code = self.store_codes.get(store_id)
+        if sku_code is None or store_code is None:
+            return None
+        return self._rows.get((sku_code, store_code))
+
+    def __contains__(self, key):
+        sku_id, store_id = key
+        return self.row(sku_id, store_id) is not None
+
+    def add_series(self, sku_id, store_id, sales):
+        """Store (or overwrite) one series aligned to the shared dates"""
+        if self.readonly:
+            raise ValueError("SalesStore wraps an external matrix and is read-only")
+        with self._lock:
+            sku_code = self._code(self.sku_codes, self.sku_ids, sku_id)
+            store_code = self._code(self.store_codes, self.store_ids, store_id)
+            row = self._rows.get((sku_code, store_code))
+            if row is None:
+                row = self.n_series
+                if row == len(self._sales):
+                    self._grow()
+                self._series_sku[row] = sku_code
+                self._series_store[row] = store_code
+                self._rows[(sku_code, store_code)] = row
+                self.n_series += 1
+            self._sales[row] = sales
+            return row
+
+    def _grow(self):
+        # Double the capacity; views handed out earlier keep the old buffer alive
+        capacity = len(self._sales) * 2
+        for name in ('_sales', '_series_sku', '_series_store'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def series(self, sku_id, store_id):
+        """Series dict with zero-copy sales view and the shared date index
+
+        A series with missing days gets a filled copy instead, starting at its
+        first observed day; one never observed is reported as not stored.
+        """
+        row = self.row(sku_id, store_id)
+        if row is None:
+            return None
+        sales = self._sales[row]
+        dates = self.dates
+        date_index = self.date_index
+        if not np.isfinite(sales).all():
+            sales, first = fill_missing(sales)
+            if sales is None:
+                return None
+            dates = dates[first:]
+            date_index = date_index[first:]
+        return {
+            'sku_id': sku_id,
+            'store_id': store_id,
+            'date': dates,
+            'date_index': date_index,
+            'sales': sales
+        }
@@ -0,0 +1,148 @@
+import itertools
+import os
+
+import numpy as np
+
+COMPETITOR_IMPACTS = {
+    'none': 1.0,
+    'price_cut': 0.8,
+    'promotion': 0.9,
+    'new_product': 0.7,
+    'aggressive': 0.6
+}
+
+SCENARIO_DEFAULTS = {
+    'weather_impact': 1.0,
+    'promotion_impact': 1.0,
+    'holiday_impact': 1.0,
+    'price_change': 0,
+    'competitor_action': 'none'
+}
+
+
+class ScenarioLimitError(ValueError):
+    """More scenarios were requested than SIMULATION_MAX_SCENARIOS allows"""
+
+
+class ScenarioEngine:
+    """What-if scenarios applied to a forecast response with NumPy broadcasting
+
+    A scenario scales demand by weather, promotion and holiday multipliers,
+    an inverse price effect and a competitor-action factor. Every forecast
+    vector in the response (point forecast, confidence interval, interval
+    levels and quantiles) is stacked into one matrix, so any number of
+    scenarios is a single (scenarios x vectors x days) multiply. Inputs are
+    never modified; each scenario gets new forecast dicts.
+    """
+
+    def __init__(self, max_scenarios=None):
+        self.max_scenarios = max_scenarios or int(os.environ.get('SIMULATION_MAX_SCENARIOS', 1000))
+
+    def expand_grid(self, grid):
+        """Scenarios for every combination of the grid's value lists"""
+        names = list(grid)
+        values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in names]
+        count = int(np.prod([len(v) for v in values])) if names else 0
+        if count > self.max_scenarios:
+            raise ScenarioLimitError(f"Scenario grid has {count} combinations; the limit is {self.max_scenarios}")
+        return [dict(zip(names, combination)) for combination in itertools.product(*values)] if names else []
+
+    def multipliers(self, scenarios):
+        """(len(scenarios),) total demand multiplier per scenario"""
+        def column(name):
+            return np.array([scenario.get(name, SCENARIO_DEFAULTS[name]) for scenario in scenarios], dtype=float)
+
+        price_multiplier = 1 / (1 + column('price_change') / 100)
+        competitor_multiplier = np.array([
+            COMPETITOR_IMPACTS.get(scenario.get('competitor_action', 'none'), 1.0) for scenario in scenarios
+        ])
+        return (column('weather_impact') * column('promotion_impact') * column('holiday_impact')
+                * price_multiplier * competitor_multiplier)
+
+    def _vectors(self, forecast):
+        """(path, values) for every per-day vector a scenario scales"""
+        vectors = [(('forecast',), forecast['forecast'])]
+        for bound in ('lower', 'upper'):
+            if bound in forecast.get('confidence_interval', {}):
+                vectors.append((('confidence_interval', bound), forecast['confidence_interval'][bound]))
+        for level, interval in forecast.get('intervals', {}).items():
+            for bound in ('lower', 'upper'):
+                if bound in interval:
+                    vectors.append((('intervals', level, bound), interval[bound]))
+        for quantile, values in forecast.get('quantiles', {}).items():
+            vectors.append((('quantiles', quantile), values))
+        return vectors
+
+    def _scaled(self, base_forecast, multipliers):
+        """{vector length: (rows, (scenarios x rows x days) scaled values)}"""
+        groups = {}
+        for key, forecast in base_forecast.get('forecasts', {}).items():
+            if 'forecast' not in forecast:
+                continue
+            for path, values in self._vectors(forecast):
+                groups.setdefault(len(values), []).append((key, path, values))
+
+        scaled = {}
+        for length, rows in groups.items():
+            matrix = np.array([values for _, _, values in rows], dtype=float).reshape(len(rows), length)
+            scaled[length] = (rows, np.maximum(0, matrix[None] * multipliers[:, None, None]))
+        return scaled
+
+    def _rebuild(self, base_forecast, scaled, index):
+        """Copy of base_forecast with scenario index's scaled vectors in place"""
+        forecasts = {}
+        for key, forecast in base_forecast.get('forecasts', {}).items():
+            forecasts[key] = dict(forecast)
+            for field in ('confidence_interval', 'quantiles'):
+                if field in forecast:
+                    forecasts[key][field] = dict(forecast[field])
+            if 'intervals' in forecast:
+                forecasts[key]['intervals'] = {level: dict(interval) for level, interval in forecast['intervals'].items()}
+
+        for rows, values in scaled.values():
+            scenario_values = values[index].tolist()
+            for (key, path, _), row in zip(rows, scenario_values):
+                target = forecasts[key]
+                for part in path[:-1]:
+                    target = target[part]
+                target[path[-1]] = row
+
+        return dict(base_forecast, forecasts=forecasts)
+
+    def apply(self, base_forecast, scenarios):
+        """One modified copy of base_forecast per scenario"""
+        if not base_forecast or 'forecasts' not in base_forecast:
+            return [dict(base_forecast or {}) for _ in scenarios]
+        scaled = self._scaled(base_forecast, self.multipliers(scenarios))
+        return [self._rebuild(base_forecast, scaled, index) for index in range(len(scenarios))]
+
+    def run(self, base_forecast, scenarios, include_forecasts=False):
+        """Per-scenario demand totals, optionally with the modified forecasts"""
+        if len(scenarios) > self.max_scenarios:
+            raise ScenarioLimitError(f"{len(scenarios)} scenarios requested; the limit is {self.max_scenarios}")
+        multipliers = self.multipliers(scenarios)
+
+        forecasts = {key: forecast for key, forecast in (base_forecast or {}).get('forecasts', {}).items()
+                     if 'forecast' in forecast}
+        keys = list(forecasts)
+        base_totals = np.array([np.maximum(0, np.asarray(forecasts[key]['forecast'], dtype=float)).sum()
+                                for key in keys])
+        # Clipping each day at zero commutes with a non-negative multiplier, so totals scale directly
+        totals = np.maximum(0, multipliers)[:, None] * base_totals[None, :]
+        base_total = base_totals.sum()
+
+        modified = self.apply(base_forecast, scenarios) if include_forecasts else None
+        results = []
+        for index, scenario in enumerate(scenarios):
+            total = float(totals[index].sum())
+            result = {
+                'scenario': scenario,
+                'multiplier': float(multipliers[index]),
+                'total_demand': total,
+                'change_pct': (total / base_total - 1) * 100 if base_total else 0.0,
+                'totals': dict(zip(keys, totals[index].tolist()))
+            }
+            if modified is not None:
+                result['modified_forecast'] = modified[index]
+            results.append(result)
+        return results
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+
+
+def cache_path(name):
+    """Default location of a local store or cache file, under backend/.cache"""
+    return os.path.join(CACHE_DIR, name)
+
+
+class SQLiteStore:
+    """Base for stores kept in one SQLite file shared by every server process
+
+    Creates the file's directory and runs the ``schema`` statements once.
+    Each thread gets its own connection; WAL mode lets readers in other
+    workers keep going while one of them writes.
+    """
+
+    schema = ()
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            for statement in self.schema:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
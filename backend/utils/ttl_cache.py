@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after ``ttl`` seconds
+
+    An expired entry is still served for another ``stale_ttl`` seconds while
+    the caller refreshes it in the background (stale-while-revalidate), so a
+    slow upstream only adds latency when nothing usable is cached at all.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, stale_ttl=None, name='cache'):
+        self.max_entries = max_entries or int(os.environ.get('EXTERNAL_CACHE_MAX_ENTRIES', 10000))
+        self.ttl = ttl if ttl is not None else float(os.environ.get('EXTERNAL_CACHE_TTL_SECONDS', 3600))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(os.environ.get('EXTERNAL_CACHE_STALE_SECONDS', 6 * 3600))
+        self.name = name
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """(value, state) with state 'fresh', 'stale' or None when unusable"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None, None
+            age = time.time() - item[0]
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if age > self.ttl:
+                self.stale_hits += 1
+                return item[1], 'stale'
+            self.hits += 1
+            return item[1], 'fresh'
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refresh_async(self, token, refresh):
+        """Run refresh() on a background thread unless one for token is already running"""
+        with self._lock:
+            if token in self._refreshing:
+                return
+            self._refreshing.add(token)
+            self.refreshes += 1
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error refreshing {self.name} entry {token}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(token)
+
+        threading.Thread(target=run, name=f"{self.name}-refresh", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes
+        }
@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from utils.storage import cache_path
+
+DEFAULT_HOT_KEYS_PATH = cache_path('hot_keys.json')
+
+
+class HotKeys:
+    """Forecast request counts per (sku_id, store_id), persisted across restarts
+
+    Counts are written to ``path`` at most every ``save_interval`` seconds,
+    keeping the ``max_keys`` most requested series, so a restarted server
+    knows which series to warm up. An empty ``HOT_KEYS_PATH`` keeps the
+    counts in memory only.
+    """
+
+    def __init__(self, path=None, save_interval=None, max_keys=None):
+        if path is None:
+            path = os.environ.get('HOT_KEYS_PATH', DEFAULT_HOT_KEYS_PATH)
+        self.path = path or None
+        self.save_interval = save_interval or float(os.environ.get('HOT_KEYS_SAVE_SECONDS', 300))
+        self.max_keys = max_keys or int(os.environ.get('HOT_KEYS_MAX', 10000))
+        self.counts = Counter(self._load())
+        self._saved_at = time.time()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return {(sku_id, store_id): count for sku_id, store_id, count in json.load(f)}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Could not load hot keys: {e}")
+            return {}
+
+    def record(self, pairs):
+        with self._lock:
+            self.counts.update(pairs)
+            due = self.path and time.time() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def top(self, n):
+        """The n most requested (sku_id, store_id) pairs"""
+        with self._lock:
+            return [pair for pair, _ in self.counts.most_common(n)]
+
+    def save(self):
+        """Write the counts atomically so a crash never leaves a partial file"""
+        if not self.path:
+            return
+        with self._lock:
+            self._saved_at = time.time()
+            rows = [[sku_id, store_id, count] for (sku_id, store_id), count in self.counts.most_common(self.max_keys)]
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(rows, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save hot keys: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class Warmup:
+    """Pre-fits the most requested series in a background thread after startup
+
+    The server answers /api/health and requests straight away; once
+    ``delay`` seconds have passed the thread fits ARIMA models for the
+    ``limit`` hottest series (topped up with catalog series while fewer have
+    been recorded), which also loads pandas and statsmodels before the first
+    real forecast needs them. ``WARMUP_KEYS=0`` (the default) disables it.
+    """
+
+    def __init__(self, hot_keys, build_tasks, model, catalog_keys, limit=None, delay=None, forecast_days=30):
+        self.hot_keys = hot_keys
+        self.build_tasks = build_tasks
+        self.model = model
+        self.catalog_keys = catalog_keys
+        self.limit = limit if limit is not None else int(os.environ.get('WARMUP_KEYS', 0))
+        self.delay = delay if delay is not None else float(os.environ.get('WARMUP_DELAY_SECONDS', 1))
+        self.forecast_days = forecast_days
+        self.state = 'idle'
+        self.statuses = Counter()
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def start(self):
+        """Start the warm-up thread once; returns it, or None when disabled"""
+        if self.limit <= 0:
+            self.state = 'disabled'
+            return None
+        if self._thread is None:
+            self.state = 'scheduled'
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def keys(self):
+        """The hottest series, topped up with catalog series when fewer were recorded"""
+        pairs = self.hot_keys.top(self.limit)
+        if len(pairs) < self.limit:
+            seen = set(pairs)
+            pairs += [pair for pair in self.catalog_keys() if pair not in seen][:self.limit - len(pairs)]
+        return pairs
+
+    def _run(self):
+        time.sleep(self.delay)
+        self.state = 'running'
+        self.started_at = time.time()
+        try:
+            stores_by_sku = defaultdict(list)
+            for sku_id, store_id in self.keys():
+                stores_by_sku[sku_id].append(store_id)
+            for sku_id, store_ids in stores_by_sku.items():
+                for task in self.build_tasks([sku_id], store_ids, self.forecast_days):
+                    _, status = self.model.update(task['data'], task['key'])
+                    self.statuses[status] += 1
+            self.state = 'done'
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+            self.state = 'failed'
+        self.finished_at = time.time()
+        print(f"Warm-up {self.state}: {dict(self.statuses)}")
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'limit': self.limit,
+            'statuses': dict(self.statuses),
+            'seconds': (self.finished_at or time.time()) - self.started_at if self.started_at else None
+        }
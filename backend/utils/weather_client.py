@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# OpenWeatherMap condition groups mapped onto the app's conditions
+CONDITIONS = {
+    'Clear': 'clear',
+    'Rain': 'rain',
+    'Drizzle': 'rain',
+    'Thunderstorm': 'rain',
+    'Snow': 'rain'
+}
+
+
+def _condition(payload):
+    weather = payload.get('weather') or [{}]
+    return CONDITIONS.get(weather[0].get('main'), 'cloudy')
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for ``reset_timeout`` seconds
+
+    After ``failure_threshold`` consecutive failed calls the breaker opens and
+    callers go straight to their fallback. Once the timeout passes a single
+    trial call is let through; success closes the breaker again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class WeatherClient:
+    """Pooled OpenWeatherMap client fetching many stores concurrently
+
+    One ``requests.Session`` keeps connections alive across calls, a thread
+    pool bounds how many stores are fetched at once, and each request gets a
+    timeout and retries with exponential backoff. A circuit breaker stops
+    calls while the upstream is failing; a store whose fetch fails comes back
+    as None so the caller can fall back.
+    """
+
+    def __init__(self, api_key, base_url, max_workers=None, timeout=None, retries=None,
+                 backoff=None, breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers or int(os.environ.get('WEATHER_API_WORKERS', 8))
+        self.timeout = timeout or float(os.environ.get('WEATHER_API_TIMEOUT', 5))
+        self.retries = retries if retries is not None else int(os.environ.get('WEATHER_API_RETRIES', 2))
+        self.backoff = backoff if backoff is not None else float(os.environ.get('WEATHER_API_BACKOFF', 0.5))
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='weather')
+
+    def _get(self, path, params):
+        """JSON payload for one call, or None once retries are exhausted or the breaker is open"""
+        params = dict(params, appid=self.api_key, units='metric')
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                return None
+            try:
+                response = self.session.get(f"{self.base_url}/{path}", params=params, timeout=self.timeout)
+                # Client errors other than rate limiting will not succeed on retry
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success()
+                    print(f"Weather API rejected {path}: HTTP {response.status_code}")
+                    return None
+                response.raise_for_status()
+                payload = response.json()
+                self.breaker.record_success()
+                return payload
+            except (requests.RequestException, ValueError) as e:
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    print(f"Weather API call {path} failed: {e}")
+                    return None
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _map(self, fn, items):
+        """Run fn over (store_id, value) items concurrently, as {store_id: result}"""
+        items = list(items)
+        results = self._executor.map(lambda item: fn(*item), items)
+        return {store_id: result for (store_id, _), result in zip(items, results)}
+
+    def current_many(self, coordinates):
+        """Current weather for {store_id: (lat, lon)}; None for stores that failed"""
+        def fetch(store_id, coords):
+            payload = self._get('weather', {'lat': coords[0], 'lon': coords[1]})
+            if payload is None:
+                return None
+            main = payload.get('main', {})
+            return {
+                'temperature': main.get('temp'),
+                'humidity': main.get('humidity'),
+                'wind_speed': payload.get('wind', {}).get('speed'),
+                'visibility': payload.get('visibility', 0) / 1000,
+                'weather_condition': _condition(payload),
+                'pressure': main.get('pressure')
+            }
+        return self._map(fetch, coordinates.items())
+
+    def forecast_many(self, coordinates):
+        """Daily forecasts for {store_id: (lat, lon)} as {store_id: {date: day}}
+
+        The 3-hourly forecast is aggregated per day: mean temperature,
+        humidity and wind speed, and the most frequent condition.
+        """
+        def fetch(store_id, coords):
+            payload = self._get('forecast', {'lat': coords[0], 'lon': coords[1]})
+            if payload is None:
+                return None
+            slots = defaultdict(list)
+            for slot in payload.get('list', []):
+                slots[datetime.fromtimestamp(slot['dt'], timezone.utc).strftime('%Y-%m-%d')].append(slot)
+            days = {}
+            for date_str, day_slots in slots.items():
+                mains = [slot.get('main', {}) for slot in day_slots]
+                days[date_str] = {
+                    'date': date_str,
+                    'temperature': round(sum(main.get('temp', 0) for main in mains) / len(mains), 1),
+                    'humidity': round(sum(main.get('humidity', 0) for main in mains) / len(mains)),
+                    'wind_speed': round(sum(slot.get('wind', {}).get('speed', 0) for slot in day_slots) / len(day_slots), 1),
+                    'weather_condition': Counter(_condition(slot) for slot in day_slots).most_common(1)[0][0]
+                }
+            return days
+        return self._map(fetch, coordinates.items())
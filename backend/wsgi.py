@@ -0,0 +1,44 @@
+"""Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With ``preload_app`` the master process imports this module once, loads the
+warm state below and then forks the workers, so the catalog, holiday index,
+fitted ARIMA models and the trained LSTM are shared copy-on-write instead of
+being rebuilt in every worker.
+"""
+import gc
+import os
+import time
+
+# Collecting during the import only moves objects between generations; wait
+# until everything is loaded and then freeze it
+gc.disable()
+
+from app import app, arima_model, lstm_model  # noqa: E402
+
+
+def preload_state():
+    """Load the state every worker needs before the master forks"""
+    started = time.time()
+    # Fitted ARIMA models written by earlier runs or `batch_jobs.py update-models`
+    loaded = arima_model.models.preload(int(os.environ.get('PRELOAD_ARIMA_MODELS', 0)) or None)
+
+    # The network saved by an earlier deploy; training only happens on the first one
+    lstm = 'not loaded'
+    if os.environ.get('PRELOAD_LSTM', '1') != '0':
+        if lstm_model.load():
+            lstm = f"loaded (trained on {lstm_model.trained_series} series)"
+        elif lstm_model.train():
+            lstm = f"trained on {lstm_model.trained_series} series"
+
+    print(f"Preloaded {loaded} ARIMA models, LSTM {lstm}, in {time.time() - started:.1f}s")
+
+
+preload_state()
+
+# Move everything loaded so far into a permanent generation: the collector
+# never touches these objects again, so their pages stay shared after fork
+gc.collect()
+gc.freeze()
+gc.enable()
@@ -77,7 +77,7 @@ case $choice in
         echo "   - Connect your GitHub repo"
         echo "   - Set root directory to 'backend'"
         echo "   - Build command: pip install -r requirements.txt"
-        echo "   - Start command: python app.py"
+        echo "   - Start command: gunicorn -c gunicorn.conf.py wsgi:app"
         echo ""
         echo "2. Deploy Frontend to Netlify:"
         echo "   - Go to https://netlify.com"
@@ -136,7 +136,7 @@ case $choice in
         echo "   Backend: backend/"
         echo ""
         echo "🚀 To run in production:"
-        echo "   Backend: python app.py"
+        echo "   Backend: cd backend && gunicorn -c gunicorn.conf.py wsgi:app"
         echo "   Frontend: Serve build/ directory with a web server"
         ;;
     *)
@@ -115,8 +115,9 @@ function Dashboard() {
       setForecastData(forecast);
       
       // Also fetch inventory suggestions
+      // Reference the server-side forecast instead of posting it back
       const suggestions = await fetchInventorySuggestions({
-        forecasts: forecast.forecasts,
+        ...(forecast.forecast_id ? { forecast_id: forecast.forecast_id } : { forecasts: forecast }),
         current_inventory: {
           'SKU001_STORE001': 150,
           'SKU001_STORE002': 200,